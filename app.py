@@ -1,19 +1,45 @@
-from flask import Flask, render_template, request, url_for, redirect, flash, jsonify
+from flask import Flask, Response, g, render_template, request, url_for, redirect, flash, jsonify, stream_with_context
 from werkzeug.utils import secure_filename
-from natural_tts import Natural_TTS
+from natural_tts import AUDIO_MIMETYPES, Natural_TTS, encode_audio
 import os
 import uuid
-import pdf2image
-from PIL import Image
+import time
+import numpy as np
 import logging
+from collections import Counter
 from ocr import *
+import metrics
+from jobs import JobManager, QueueFull
+from result_cache import ResultCache, audio_key, document_key
+from tts_server import TTS_SOCKET, TTSClient
+from text_normalize import HeaderFooterFilter, chunk_text, normalize_text
+from pipeline import Pipeline, Stage
+from warmup import Warmup
 import shutil
 
+logging.basicConfig(level=os.environ.get('LOG_LEVEL', 'INFO').upper(),
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+# Models load in a background thread after startup and /readyz turns 200
+# once they are in. PRELOAD_MODELS=1 loads them at import instead, so with
+# `gunicorn --preload` the master loads them once and the forked workers
+# share those pages copy-on-write (see gunicorn.conf.py).
+PRELOAD_MODELS = os.environ.get('PRELOAD_MODELS', '0') == '1'
+WARMUP_MODELS = os.environ.get('WARMUP_MODELS', '1') == '1'
 
 app = Flask(__name__)
 app.config["UPLOAD_FOLDER"] = "./templates/uploads"
+OUTPUT_FOLDER = "./static/output"
+# Published audio and PDFs are renamed into here, so it must exist up front
+os.makedirs(OUTPUT_FOLDER, exist_ok=True)
+
+# With TTS_SOCKET set, synthesis goes to the shared tts_server process instead
+# of loading a Kokoro model in every worker. The model loads on first use or
+# during warm-up, never at import.
+tts = TTSClient(TTS_SOCKET) if TTS_SOCKET else Natural_TTS(lazy=True)
+cache = ResultCache()
 
-tts = Natural_TTS()
+REQUEST_SECONDS = metrics.histogram('readdf_http_request_seconds', "Time to produce a response, by endpoint and status")
 
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'pdf'}
 
@@ -46,103 +72,405 @@ def index():
 
 #     return 'File upload failed'
 
-@app.route('/file', methods=['POST'])
-def convert():
+def publish(source, name):
+    # Move a finished file into OUTPUT_FOLDER in one atomic step, so the
+    # browser never sees a half-written file under its final name
+    destination = os.path.join(OUTPUT_FOLDER, name)
+    try:
+        os.replace(source, destination)
+    except OSError:
+        # Workspace is on another filesystem: copy next to the target first
+        partial_path = f"{destination}.part"
+        shutil.copyfile(source, partial_path)
+        os.replace(partial_path, destination)
+        os.remove(source)
+    return name
+
+def save_upload(file):
+    # Generate unique identifier for this job
+    unique_id = str(uuid.uuid4())
+    file_extension = file.filename.rsplit('.', 1)[1].lower()
+    
+    # Every job gets its own workspace for intermediate files
+    workspace = os.path.join(UPLOAD_FOLDER, unique_id)
+    os.makedirs(workspace, exist_ok=True)
+    
+    # Save uploaded file
+    temp_path = os.path.join(workspace, f"upload.{file_extension}")
+    filename=f"{unique_id}.{file_extension}"
+    file.seek(0)
+    file.save(temp_path)
+    shutil.copyfile(temp_path, os.path.join(workspace, filename))
+    publish(os.path.join(workspace, filename), filename)
+    return {'unique_id': unique_id, 'file_extension': file_extension, 'temp_path': temp_path,
+            'filename': filename, 'workspace': workspace}
+
+def run_ocr(job, unique_id, file_extension, temp_path, language, on_page=None):
+    # Process based on file type. Returns one text per page; failed pages
+    # are empty. on_page(page_num, text) is called for each page in page
+    # order as soon as it (and every page before it) is recognized.
+    page_texts = []
+    processing_details = []
+    ocr_stats = {}
+    finished_pages = {}
+    
+    def release(page_num, result):
+        if result['error']:
+            logger.error(f"Page {page_num + 1} failed: {result['error']}")
+            processing_details.append(f"Page {page_num + 1}: Failed ({result['error']})")
+            ocr_stats['failed_pages'] = ocr_stats.get('failed_pages', 0) + 1
+            page_texts.append("")
+        else:
+            page_texts.append(result['text'])
+            processing_details.append(f"Page {page_num + 1}: Used {result['method']} with confidence {result['confidence']:.2f}")
+            for key in ('ocr_calls', 'ocr_calls_saved'):
+                ocr_stats[key] = ocr_stats.get(key, 0) + result['stats'].get(key, 0)
+        if on_page:
+            on_page(page_num, page_texts[-1])
+    
+    def page_done(page_num, result):
+        # Pages finish in any order; hand them on in page order
+        job.pages_done += 1
+        finished_pages[page_num] = result
+        while len(page_texts) in finished_pages:
+            release(len(page_texts), finished_pages.pop(len(page_texts)))
+    
+    with jobs.stage(job, 'ocr'):
+        if file_extension == 'pdf':
+            # Rasterize the PDF a window at a time and OCR pages in
+            # parallel as they are produced
+            job.pages_total = pdf_page_count(temp_path)
+            pdf_pages = iter_pdf_pages(temp_path, dpi=300)
+            ocr_pages(pdf_pages, unique_id, language, on_page_done=page_done, cache=cache)
+        else:
+            job.pages_total = 1
+            # Same path as a PDF page, including layout-aware region OCR
+            result = process_page(temp_path, unique_id, language)
+            page_done(0, result)
+    
+    # processing_info = "\n".join(processing_details)
+    return page_texts, ocr_stats
+
+def run_conversion(job):
+    # The OCR -> TTS pipeline for one uploaded file, run on a job worker
+    try:
+        return convert_upload(job)
+    finally:
+        shutil.rmtree(job.params['workspace'], ignore_errors=True)
+
+def convert_upload(job):
+    unique_id = job.params['unique_id']
+    file_extension = job.params['file_extension']
+    temp_path = job.params['temp_path']
+    filename = job.params['filename']
+    language = job.params['language']
+    workspace = job.params['workspace']
+    
+    # OCR -> normalization -> TTS run as a staged pipeline: page 1 is being
+    # synthesized while later pages are still being recognized
+    doc_key = document_key(temp_path, language)
+    ocr_stats = {}
+    transcription = []
+    header_filter = HeaderFooterFilter()
+    speed = 1
+    
+    def recognize(emit):
+        cached_text = cache.get_json(doc_key)
+        if cached_text is not None and 'page_texts' in cached_text:
+            # Seen this exact file before: skip OCR entirely
+            job.pages_total = job.pages_done = len(cached_text['page_texts'])
+            for text in cached_text['page_texts']:
+                emit(text)
+            return
+        page_texts, stats = run_ocr(job, unique_id, file_extension, temp_path, language,
+                                    on_page=lambda page_num, text: emit(text))
+        ocr_stats.update(stats)
+        # Don't pin a partial transcription in the cache
+        if not stats.get('failed_pages'):
+            cache.put_json(doc_key, {'page_texts': page_texts})
+    
+    def add_page(text, emit):
+        # Clean up OCR output (hyphenation, junk) and split it into
+        # sentence-sized chunks for the TTS stage
+        text = normalize_text(text)
+        if file_extension == 'pdf':
+            text = f"Page {len(transcription) + 1}:\n\n{text}"
+        transcription.append(text)
+        # Published page by page so the result page can show the text read
+        # so far while the audio streams
+        job.transcription = "\n\n".join(transcription)
+        for chunk in chunk_text(text):
+            emit(chunk)
+    
+    def normalize(page_text, emit):
+        # Repeated headers/footers are learned from the first few pages
+        for text in header_filter.push(page_text):
+            add_page(text, emit)
+    
+    def normalize_flush(emit):
+        for text in header_filter.flush():
+            add_page(text, emit)
+        job.transcription = "\n\n".join(transcription)
+    
+    audio_name = f"{unique_id}.mp3"
+    partial_path = os.path.join(workspace, audio_name)
+    
+    # Float32 audio of every chunk, encoded once into the published file.
+    # MP3 chunks concatenate into a playable stream but leave an encoder
+    # delay and padding at every boundary.
+    segments = []
+    
+    def synthesize(chunk, emit):
+        # Each chunk is cached by its content id, so a chunk seen before
+        # never touches the model
+        key = audio_key(chunk['id'], tts.voice, speed)
+        pcm = cache.get_bytes(key, 'f32')
+        if pcm is None:
+            with jobs.stage(job, 'tts'):
+                parts = list(metrics.timed('tts_segment', tts.segments(chunk['text'], vspeed=speed)))
+            audio = np.concatenate(parts) if parts else np.zeros(0, dtype=np.float32)
+            cache.put_bytes(key, 'f32', audio.astype(np.float32).tobytes())
+        else:
+            audio = np.frombuffer(pcm, dtype=np.float32)
+        segments.append(audio)
+        # Stream each chunk to listeners as soon as it is ready
+        with metrics.span('audio_encode', format='mp3'):
+            job.add_audio_chunk(encode_audio(audio, 'mp3'))
+    
+    try:
+        pipeline = Pipeline('ocr', recognize, [
+            Stage('normalize', normalize, flush=normalize_flush),
+            Stage('tts', synthesize),
+        ])
+        job.pipeline = pipeline
+        pipeline.run()
+        audio = np.concatenate(segments) if segments else np.zeros(0, dtype=np.float32)
+        with metrics.span('audio_encode', format='mp3'):
+            with open(partial_path, 'wb') as audio_file:
+                audio_file.write(encode_audio(audio, 'mp3'))
+        publish(partial_path, audio_name)
+    finally:
+        job.finish_audio()
+    
+    metrics.log_event(logger, logging.INFO, 'job_stats', job=job.id,
+                      ocr_calls=ocr_stats.get('ocr_calls', 0), ocr_calls_saved=ocr_stats.get('ocr_calls_saved', 0),
+                      failed_pages=ocr_stats.get('failed_pages', 0), stages=pipeline.stats(), cache=cache.stats())
+    extracted_text = job.transcription
+    metrics.log_event(logger, logging.DEBUG, 'transcription', job=job.id, pages=len(transcription),
+                      chars=len(extracted_text), preview=extracted_text[:200])
+    
+    data = {'transcription': extracted_text, "pdf": filename, "audio": audio_name}
+    # {
+    # "transcription": "<full text of the transcription>",
+    # "pdf": "<filename>.pdf",
+    # "audio": "<filename>.mp3"
+    # }
+    
+    metrics.log_event(logger, logging.DEBUG, 'result', job=job.id, pdf=filename, audio=audio_name)
+    return data
+
+jobs = JobManager(run_conversion)
+
+def warm_tts():
+    tts.load()
+    if not PRELOAD_MODELS:
+        # One short synthesis so the first real chunk doesn't pay for kernel
+        # setup. Skipped before a fork: torch thread pools don't survive it.
+        for _ in tts.segments("Ready."):
+            pass
+
+warmup = Warmup({'ocr': warm_up_ocr, 'ocr_workers': warm_up_ocr_workers, 'tts': warm_tts})
+# OCR pool workers re-import the main script as __mp_main__ when the server
+# was started with `python app.py`; they must not load the models again
+if __name__ != '__mp_main__':
+    if PRELOAD_MODELS:
+        # The OCR pool can't cross a fork, so each gunicorn worker starts it
+        # in post_fork. Without a fork (python app.py) it starts with the
+        # first document and doesn't hold up readiness.
+        warmup.defer(['ocr_workers'])
+        warmup.run(names=['ocr', 'tts'])
+    elif WARMUP_MODELS:
+        warmup.start()
+
+def submit_upload():
+    # Validate and save the uploaded file, then queue it. Returns (job, error)
     if 'file' not in request.files:
-        return render_template('index.html', error='No file selected')
+        return None, 'No file selected'
     
     file = request.files['file']
     
     if file.filename == '':
-        return render_template('index.html', error='No file selected')
+        return None, 'No file selected'
+    
+    # Check if the file is allowed based on the extension
+    if not allowed_file(file.filename):
+        return None, 'Invalid file type'
     
     language = request.form.get('language', 'eng')
+    # ?profile=1 runs the job under the sampling profiler (see /jobs/<id>/profile)
+    profile = metrics.PROFILING_ENABLED and request.args.get('profile') == '1'
+    started = time.perf_counter()
+    upload = save_upload(file)
+    upload_seconds = time.perf_counter() - started
+    try:
+        job = jobs.submit(language=language, profile=profile, **upload)
+    except QueueFull:
+        shutil.rmtree(upload['workspace'], ignore_errors=True)
+        os.remove(os.path.join(OUTPUT_FOLDER, upload['filename']))
+        raise
+    job.trace.record('upload_save', upload_seconds)
+    return job, None
+
+def job_links(job):
+    links = {
+        'status': url_for('job_status', job_id=job.id),
+        'result': url_for('job_result', job_id=job.id),
+        'stream': url_for('job_audio', job_id=job.id),
+    }
+    if job.result:
+        links['pdf'] = url_for('static', filename=f"output/{job.result['pdf']}")
+        links['audio'] = url_for('static', filename=f"output/{job.result['audio']}")
+    return links
+
+@app.route('/file', methods=['POST'])
+def convert():
+    try:
+        job, error = submit_upload()
+    except QueueFull:
+        return render_template('index.html', error='Server is busy, please try again shortly'), 429
+    except Exception as e:
+        logger.exception("Error in conversion process")
+        return render_template('index.html', error=f"Error during processing: {str(e)}")
+    if error:
+        return render_template('index.html', error=error)
     
-    # Check if the file is allowed based on the extension
-    if file and allowed_file(file.filename):
-        try:
-            # Generate unique identifier for this job
-            unique_id = str(uuid.uuid4())
-            file_extension = file.filename.rsplit('.', 1)[1].lower()
-            
-            # Save uploaded file
-            temp_path = os.path.join(UPLOAD_FOLDER, f"{unique_id}.{file_extension}")
-            filename=f"{unique_id}.{file_extension}"
-            perma_path=os.path.join("./static/output",f"{unique_id}.{file_extension}")
-            file.seek(0)
-            file.save(temp_path)
-            file.seek(0)
-            file.save(perma_path)
-
-            # Process based on file type
-            all_text = []
-            processing_details = []
-            
-            if file_extension == 'pdf':
-                # Convert PDF to images
-                pdf_pages = pdf2image.convert_from_path(temp_path, dpi=300)
-                for page_num, page in enumerate(pdf_pages):
-                    # Save the PDF page as an image
-                    page_path = os.path.join(UPLOAD_FOLDER, f"{unique_id}_page_{page_num}.jpg")
-                    page.save(page_path, 'JPEG')
-                    
-                    # Process the image with our comprehensive pipeline
-                    processed_versions = comprehensive_image_processing(page_path, f"{unique_id}_page_{page_num}")
-                    
-                    if processed_versions:
-                        # Extract text from all processed versions
-                        text, confidence, method = extract_best_text(processed_versions, language)
-                        all_text.append(f"Page {page_num + 1}:\n{text}\n")
-                        processing_details.append(f"Page {page_num + 1}: Used {method} with confidence {confidence:.2f}")
-                    
-                    # Clean up the page image
-                    if os.path.exists(page_path):
-                        os.remove(page_path)
-            else:
-                # Process the image with our comprehensive pipeline
-                processed_versions = comprehensive_image_processing(temp_path, unique_id)
-                
-                if processed_versions:
-                    # Extract text from all processed versions
-                    text, confidence, method = extract_best_text(processed_versions, language)
-                    all_text.append(text)
-                    processing_details.append(f"Used {method} with confidence {confidence:.2f}")
-            
-            # Combine all extracted text
-            extracted_text = "\n".join(all_text)
-            # processing_info = "\n".join(processing_details)
-            
-            # Clean up original uploaded file
-            if os.path.exists(temp_path):
-                os.remove(temp_path)
-            print(extracted_text)
-            tts.text_to_speech(extracted_text)
-            
-            
-            data = {'transcription': extracted_text, "pdf": filename, "audio": "output.mp3"}
-            # {
-            # "transcription": "<full text of the transcription>",
-            # "pdf": "<filename>.pdf",
-            # "audio": "<filename>.mp3"
-            # }
-            
-            print(data)
-            print(jsonify(data))
-
-            # Provide result to user
-            return render_template('homepage.html', data = data)
-        
-        except Exception as e:
-            logger.exception("Error in conversion process")
-            return render_template('index.html', error=f"Error during processing: {str(e)}")
+    # Show a progress page that polls /jobs/<id> until the result is ready
+    return render_template('job.html', job=job.to_dict(), links=job_links(job))
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    try:
+        job, error = submit_upload()
+    except QueueFull as e:
+        return jsonify({'error': str(e)}), 429, {'Retry-After': '5'}
+    if error:
+        return jsonify({'error': error}), 400
+    return jsonify({'id': job.id, 'links': job_links(job)}), 202
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    status = job.to_dict()
+    status['links'] = job_links(job)
+    return jsonify(status)
+
+@app.route('/jobs/<job_id>/result')
+def job_result(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        return render_template('index.html', error='Unknown job'), 404
+    if job.stage == 'failed':
+        return render_template('index.html', error=f"Error during processing: {job.error}")
+    if job.stage == 'done':
+        data = dict(job.result, audio_url=url_for('static', filename=f"output/{job.result['audio']}"))
+    elif job.chunks_done > 0:
+        # Audio has started and the rest is still being read/synthesized:
+        # play it from the stream. The .mp3 isn't published yet, so there's
+        # nothing to download.
+        data = {'transcription': job.transcription or "", "pdf": job.params['filename'],
+                "audio": f"{job.params['unique_id']}.mp3", 'audio_url': url_for('job_audio', job_id=job.id),
+                'streaming': True}
+    else:
+        return render_template('job.html', job=job.to_dict(), links=job_links(job))
     
-    return render_template('index.html', error='Invalid file type')
+    # Provide result to user
+    return render_template('homepage.html', data = data)
+
+@app.route('/jobs/<job_id>/audio')
+def job_audio(job_id):
+    # Progressive audio: chunked MP3 that starts with the first synthesized
+    # segment and grows until synthesis finishes
+    job = jobs.get(job_id)
+    if job is None or job.stage == 'failed':
+        return jsonify({'error': 'Unknown job' if job is None else job.error}), 404
+    if job.done and not job.audio_chunks:
+        return redirect(url_for('static', filename=f"output/{job.result['audio']}"))
+    return Response(stream_with_context(job.iter_audio()), mimetype=AUDIO_MIMETYPES['mp3'],
+                    headers={'Cache-Control': 'no-cache'})
+
+@app.route('/jobs/<job_id>/profile')
+def job_profile(job_id):
+    # Collapsed stacks from the sampling profiler, for flamegraph.pl/speedscope
+    job = jobs.get(job_id)
+    if job is None or job.profile is None:
+        return jsonify({'error': 'No profile for this job'}), 404
+    return Response(job.profile, mimetype='text/plain')
+
+def collect_app_metrics():
+    cache_stats = cache.stats()
+    with jobs.lock:
+        stages = Counter(job.stage for job in jobs.jobs.values())
+    return [
+        ('readdf_cache_hits_total', 'counter', "Result cache hits by kind",
+         [({'kind': kind}, counts['hits']) for kind, counts in cache_stats.items()]),
+        ('readdf_cache_misses_total', 'counter', "Result cache misses by kind",
+         [({'kind': kind}, counts['misses']) for kind, counts in cache_stats.items()]),
+        ('readdf_job_queue_depth', 'gauge', "Jobs waiting for a worker", [({}, jobs.queue.qsize())]),
+        ('readdf_jobs', 'gauge', "Jobs still held by the manager, by stage",
+         [({'stage': stage}, count) for stage, count in sorted(stages.items())]),
+    ]
+
+def collect_tts_metrics():
+    # Scheduling stats from the shared TTS server, when we use one
+    if not isinstance(tts, TTSClient):
+        return []
+    server_stats = tts.stats()
+    families = []
+    for name, kind, key, help in (('readdf_tts_queue_depth', 'gauge', 'queue_depth', "Segments waiting for the model"),
+                                  ('readdf_tts_segments_total', 'counter', 'segments', "Segments synthesized by the TTS server"),
+                                  ('readdf_tts_mean_queue_wait_seconds', 'gauge', 'mean_queue_wait_seconds',
+                                   "Mean time a segment waited for the model"),
+                                  ('readdf_tts_mean_jobs_sharing', 'gauge', 'mean_jobs_sharing',
+                                   "Mean number of jobs taking turns on the model when a segment started")):
+        families.append((name, kind, help, [({'language': language}, stats[key]) for language, stats in server_stats.items()]))
+    return families
+
+metrics.register_collector(collect_app_metrics)
+metrics.register_collector(collect_tts_metrics)
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request(response):
+    if 'request_started' in g:
+        REQUEST_SECONDS.observe(time.perf_counter() - g.request_started,
+                                endpoint=request.endpoint or 'unknown', status=response.status_code)
+    return response
+
+@app.route('/healthz')
+def healthz():
+    # Liveness: the process is up and serving requests
+    return jsonify({'status': 'ok'})
+
+@app.route('/readyz')
+def readyz():
+    # Readiness: the OCR engine and TTS model are loaded
+    ready = warmup.ready
+    return jsonify({'ready': ready, 'models': warmup.to_dict()}), 200 if ready else 503
+
+@app.route('/metrics')
+def prometheus_metrics():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
 
 @app.route('/cleanup', methods=['POST'])
 def cleanup():
     try:
         # Remove files from processed folder
-        for filename in os.listdir(PROCESSED_FOLDER):
+        for filename in os.listdir(PROCESSED_FOLDER) if os.path.isdir(PROCESSED_FOLDER) else []:
             file_path = os.path.join(PROCESSED_FOLDER, filename)
             if os.path.isfile(file_path):
                 os.remove(file_path)
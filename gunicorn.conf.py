@@ -0,0 +1,28 @@
+"""Gunicorn settings.
+
+    gunicorn app:app -c gunicorn.conf.py
+
+With PRELOAD_MODELS=1 the app, and the OCR/TTS models with it, are loaded once
+in the master before forking, so every worker shares the model pages
+copy-on-write instead of loading its own copy. The OCR worker pool is not
+shared: each gunicorn worker starts and warms its own after the fork.
+"""
+import os
+
+bind = os.environ.get('BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+# Audio streams hold a thread for as long as synthesis runs
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+timeout = 120
+preload_app = os.environ.get('PRELOAD_MODELS', '0') == '1'
+
+def post_fork(server, worker):
+    # Threads don't survive fork: restart the job workers, and finish the
+    # warm-up here (at least the OCR worker pool, which each gunicorn worker
+    # starts for itself)
+    if preload_app:
+        import app
+        app.jobs.start()
+        # Only runs what isn't ready yet, including the deferred OCR pool
+        app.warmup.start()
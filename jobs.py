@@ -0,0 +1,192 @@
+import os
+import time
+import uuid
+import queue
+import logging
+import threading
+from contextlib import contextmanager
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Jobs waiting for a worker before submissions are rejected with a 429
+JOB_QUEUE_SIZE = int(os.environ.get('JOB_QUEUE_SIZE', 16))
+# Jobs running the OCR -> TTS pipeline at the same time
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 4))
+# Per-stage concurrency: OCR is CPU bound (and parallel inside a job already),
+# TTS is bound by the single Kokoro model. With TTS_SOCKET set the model
+# lives in tts_server, which takes turns between concurrent jobs segment by
+# segment, so every job worker may synthesize at once; with a limit of 1 one
+# job's audio would hold up every other job's first chunk.
+STAGE_LIMITS = {
+    'ocr': int(os.environ.get('JOB_OCR_CONCURRENCY', 2)),
+    'tts': int(os.environ.get('JOB_TTS_CONCURRENCY', JOB_WORKERS if os.environ.get('TTS_SOCKET') else 1)),
+}
+# Finished jobs kept around for status lookups
+JOB_HISTORY = int(os.environ.get('JOB_HISTORY', 200))
+# Seconds a finished job keeps its streamed audio chunks in memory; after
+# that the audio is only served from the output file
+AUDIO_BUFFER_TTL = int(os.environ.get('JOB_AUDIO_BUFFER_TTL', 300))
+
+JOB_SECONDS = metrics.histogram('readdf_job_seconds', "Job run time from start to finish, by outcome")
+QUEUE_WAIT_SECONDS = metrics.histogram('readdf_job_queue_wait_seconds', "Time jobs spent queued before a worker picked them up")
+
+class QueueFull(Exception):
+    pass
+
+class Job:
+    def __init__(self, params):
+        self.id = str(uuid.uuid4())
+        self.params = params
+        self.stage = 'queued'
+        self.pages_done = 0
+        self.pages_total = None
+        self.chunks_done = 0
+        self.transcription = None
+        self.audio_chunks = []
+        self.audio_complete = False
+        self.audio_condition = threading.Condition()
+        self.pipeline = None
+        self.trace = metrics.Trace(self.id)
+        self.profile = None
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.finished = None
+
+    @property
+    def done(self):
+        return self.stage in ('done', 'failed')
+
+    def add_audio_chunk(self, chunk):
+        with self.audio_condition:
+            self.audio_chunks.append(chunk)
+            self.chunks_done = len(self.audio_chunks)
+            self.audio_condition.notify_all()
+
+    def finish_audio(self):
+        with self.audio_condition:
+            self.audio_complete = True
+            self.audio_condition.notify_all()
+
+    def iter_audio(self, timeout=300):
+        # Yields audio chunks as the TTS stage produces them, for streaming
+        # responses. Ends when the audio is complete or the job fails.
+        index = 0
+        while True:
+            with self.audio_condition:
+                while index >= len(self.audio_chunks) and not (self.audio_complete or self.stage == 'failed'):
+                    if not self.audio_condition.wait(timeout):
+                        return
+                chunks = self.audio_chunks[index:]
+                finished = self.audio_complete or self.stage == 'failed'
+            for chunk in chunks:
+                yield chunk
+            index += len(chunks)
+            if finished and index >= len(self.audio_chunks):
+                return
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'stage': self.stage,
+            'progress': {
+                'pages_done': self.pages_done,
+                'pages_total': self.pages_total,
+                'audio_chunks_done': self.chunks_done,
+            },
+            'transcription_ready': self.transcription is not None,
+            'stages': self.pipeline.stats() if self.pipeline else None,
+            'spans': self.trace.summary(),
+            'result': self.result,
+            'error': self.error,
+        }
+
+class JobManager:
+    def __init__(self, handler, queue_size=JOB_QUEUE_SIZE, workers=JOB_WORKERS, stage_limits=None):
+        # handler(job) runs the whole pipeline and returns the job result
+        self.handler = handler
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.jobs = {}
+        self.lock = threading.Lock()
+        limits = stage_limits or STAGE_LIMITS
+        self.stage_semaphores = {name: threading.BoundedSemaphore(limit) for name, limit in limits.items()}
+        self.worker_count = workers
+        self.start()
+
+    def start(self):
+        # Also called again in a forked child (gunicorn --preload), where the
+        # parent's worker threads no longer exist
+        self.workers = [threading.Thread(target=self.work, daemon=True, name=f"job-worker-{i}")
+                        for i in range(self.worker_count)]
+        for worker in self.workers:
+            worker.start()
+
+    def submit(self, **params):
+        job = Job(params)
+        with self.lock:
+            try:
+                self.queue.put_nowait(job)
+            except queue.Full:
+                raise QueueFull(f"Job queue is full ({self.queue.maxsize} waiting)")
+            self.jobs[job.id] = job
+            self.prune()
+        logger.info(f"Queued job {job.id} ({self.queue.qsize()} waiting)")
+        return job
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def prune(self):
+        finished = [job for job in self.jobs.values() if job.done and job.finished is not None]
+        for job in finished:
+            if job.audio_chunks and time.time() - job.finished > AUDIO_BUFFER_TTL:
+                job.audio_chunks = []
+        if len(finished) > JOB_HISTORY:
+            finished.sort(key=lambda job: job.finished)
+            for job in finished[:len(finished) - JOB_HISTORY]:
+                del self.jobs[job.id]
+
+    @contextmanager
+    def stage(self, job, name):
+        # Wait for a slot in the named stage, then mark the job as being in it
+        semaphore = self.stage_semaphores.get(name)
+        if semaphore is None:
+            job.stage = name
+            yield
+            return
+        with semaphore:
+            job.stage = name
+            yield
+
+    def work(self):
+        while True:
+            job = self.queue.get()
+            started = time.time()
+            QUEUE_WAIT_SECONDS.observe(started - job.created)
+            with metrics.use_trace(job.trace):
+                sampler = metrics.Sampler(job.trace).start() if job.params.get('profile') else None
+                status = 'failed'
+                try:
+                    job.result = self.handler(job)
+                    status = 'done'
+                except Exception as e:
+                    logger.exception(f"Job {job.id} failed")
+                    job.error = str(e)
+                finally:
+                    if sampler:
+                        job.profile = sampler.stop()
+                    # finished is set before the stage flips, so a job that
+                    # looks done to prune() always has a finish time
+                    job.finished = time.time()
+                    job.stage = status
+                    if status == 'failed':
+                        job.finish_audio()
+                    JOB_SECONDS.observe(job.finished - started, status=status)
+                    self.queue.task_done()
+            # Also prune here, so audio buffers expire on an idle server
+            # that isn't receiving new submissions
+            with self.lock:
+                self.prune()
@@ -0,0 +1,267 @@
+import os
+import sys
+import time
+import logging
+import threading
+import contextvars
+from collections import Counter as TallyCounter
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) shared by every latency histogram: one Tesseract call
+# up to a whole document
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+# Allow ?profile=1 on uploads to run the job under the sampling profiler
+PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', '0') == '1'
+PROFILE_INTERVAL_MS = int(os.environ.get('PROFILE_INTERVAL_MS', 5))
+
+def log_event(log, level, event, **fields):
+    # One line of `event key=value ...`; nothing is formatted unless the
+    # level is enabled, so debug events cost nothing in production
+    if log.isEnabledFor(level):
+        log.log(level, " ".join([event] + [f"{key}={value!r}" for key, value in fields.items()]))
+
+def format_labels(labels, extra=None):
+    items = sorted(labels) + ([extra] if extra else [])
+    if not items:
+        return ""
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in items)
+    return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(items, escaped)) + "}"
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, help):
+        self.name = name
+        self.help = help
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def samples(self):
+        with self.lock:
+            values = dict(self.values)
+        for labels, value in sorted(values.items()):
+            yield f"{self.name}{format_labels(labels)} {value}"
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, help, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            counts, total, count = self.values.get(key, ([0] * len(self.buckets), 0.0, 0))
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+            self.values[key] = (counts, total + value, count + 1)
+
+    def samples(self):
+        with self.lock:
+            values = {key: (list(counts), total, count) for key, (counts, total, count) in self.values.items()}
+        for labels, (counts, total, count) in sorted(values.items()):
+            for bound, bucket_count in zip(self.buckets, counts):
+                yield f"{self.name}_bucket{format_labels(labels, ('le', bound))} {bucket_count}"
+            yield f"{self.name}_bucket{format_labels(labels, ('le', '+Inf'))} {count}"
+            yield f"{self.name}_sum{format_labels(labels)} {round(total, 6)}"
+            yield f"{self.name}_count{format_labels(labels)} {count}"
+
+registry = []
+collectors = []
+
+def counter(name, help):
+    metric = Counter(name, help)
+    registry.append(metric)
+    return metric
+
+def histogram(name, help, buckets=LATENCY_BUCKETS):
+    metric = Histogram(name, help, buckets)
+    registry.append(metric)
+    return metric
+
+def register_collector(collect):
+    # collect() returns [(name, kind, help, [(labels_dict, value), ...])] for
+    # values that live elsewhere (cache hit counts, queue depth) and are read
+    # at scrape time
+    collectors.append(collect)
+
+def render():
+    # Prometheus text exposition format
+    lines = []
+    for metric in registry:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.samples())
+    for collect in collectors:
+        try:
+            families = collect()
+        except Exception as e:
+            logger.warning(f"Metrics collector {collect.__name__} failed: {e}")
+            continue
+        for name, kind, help, samples in families:
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(f"{name}{format_labels(tuple(labels.items()))} {value}" for labels, value in samples)
+    return "\n".join(lines) + "\n"
+
+SPAN_SECONDS = histogram('readdf_span_seconds', "Time spent in each traced step of a job")
+
+current_trace = contextvars.ContextVar('current_trace', default=None)
+
+class Trace:
+    # The spans of one job. Also knows which threads are working for the job
+    # right now, so the sampling profiler can watch just those.
+    def __init__(self, job_id=None):
+        self.job_id = job_id
+        self.spans = []
+        self.threads = TallyCounter()
+        self.lock = threading.Lock()
+
+    def record(self, name, seconds, **labels):
+        SPAN_SECONDS.observe(seconds, span=name, **labels)
+        with self.lock:
+            self.spans.append((name, seconds, labels))
+        log_event(logger, logging.DEBUG, 'span', job=self.job_id, span=name, seconds=round(seconds, 4), **labels)
+
+    def summary(self):
+        with self.lock:
+            spans = list(self.spans)
+        totals = {}
+        for name, seconds, _ in spans:
+            count, total = totals.get(name, (0, 0.0))
+            totals[name] = (count + 1, total + seconds)
+        return {name: {'count': count, 'seconds': round(total, 3)} for name, (count, total) in sorted(totals.items())}
+
+    @contextmanager
+    def attached(self):
+        ident = threading.get_ident()
+        with self.lock:
+            self.threads[ident] += 1
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.threads[ident] -= 1
+                if not self.threads[ident]:
+                    del self.threads[ident]
+
+    def thread_idents(self):
+        with self.lock:
+            return list(self.threads)
+
+@contextmanager
+def use_trace(trace):
+    # Make `trace` the current job for this thread (and anything bound to it)
+    token = current_trace.set(trace)
+    try:
+        with trace.attached():
+            yield trace
+    finally:
+        current_trace.reset(token)
+
+def bind(fn):
+    # Carry the current job's trace into another thread: wrap the target of
+    # a Thread or an executor.submit() with this
+    context = contextvars.copy_context()
+
+    def run_in_trace(*args, **kwargs):
+        trace = current_trace.get()
+        if trace is None:
+            return fn(*args, **kwargs)
+        with trace.attached():
+            return fn(*args, **kwargs)
+
+    def bound(*args, **kwargs):
+        return context.copy().run(run_in_trace, *args, **kwargs)
+    return bound
+
+def record(name, seconds, **labels):
+    trace = current_trace.get()
+    if trace is not None:
+        trace.record(name, seconds, **labels)
+    else:
+        SPAN_SECONDS.observe(seconds, span=name, **labels)
+
+@contextmanager
+def span(name, **labels):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start, **labels)
+
+def timed(name, iterable, **labels):
+    # Yields from iterable, recording how long each item took to produce
+    iterator = iter(iterable)
+    while True:
+        start = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            return
+        record(name, time.perf_counter() - start, **labels)
+        yield item
+
+@contextmanager
+def collect_spans():
+    # For work in another process: spans go into a fresh trace whose .spans
+    # the caller sends back to the parent to replay()
+    with use_trace(Trace()) as trace:
+        yield trace
+
+def replay(spans):
+    for name, seconds, labels in spans:
+        record(name, seconds, **labels)
+
+class Sampler:
+    # Sampling profiler for one job: every interval, grab the stack of each
+    # thread attached to the trace and count it. Cheap enough to leave on for
+    # a whole job, unlike cProfile. Pages OCR'd in worker processes are not
+    # sampled; their time shows up under the span histograms instead.
+    def __init__(self, trace, interval_ms=None):
+        self.trace = trace
+        self.interval = (interval_ms or PROFILE_INTERVAL_MS) / 1000
+        self.stacks = TallyCounter()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True, name=f"profiler-{trace.job_id}")
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def run(self):
+        own = threading.get_ident()
+        while not self.stopped.wait(self.interval):
+            frames = sys._current_frames()
+            for ident in self.trace.thread_idents():
+                frame = frames.get(ident)
+                if frame is not None and ident != own:
+                    self.stacks[self.fold(frame)] += 1
+
+    @staticmethod
+    def fold(frame):
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+            frame = frame.f_back
+        return ";".join(reversed(names))
+
+    def stop(self):
+        # Returns the samples in collapsed-stack format (one "a;b;c count"
+        # line per stack), ready for flamegraph.pl or speedscope
+        self.stopped.set()
+        self.thread.join()
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common())
@@ -1,7 +1,19 @@
-from kokoro import KPipeline
+import io
+import os
+import threading
+import numpy as np
 import soundfile as sf
-from moviepy.audio.AudioClip import concatenate_audioclips
-from moviepy import AudioFileClip
+import metrics
+
+SAMPLE_RATE = 24000
+# soundfile container names for the formats we can hand back to the browser
+AUDIO_FORMATS = {'mp3': 'MP3', 'ogg': 'OGG', 'wav': 'WAV'}
+AUDIO_MIMETYPES = {'mp3': 'audio/mpeg', 'ogg': 'audio/ogg', 'wav': 'audio/wav'}
+
+def encode_audio(audio, audio_format='mp3'):
+    buffer = io.BytesIO()
+    sf.write(buffer, np.asarray(audio, dtype=np.float32), SAMPLE_RATE, format=AUDIO_FORMATS[audio_format])
+    return buffer.getvalue()
 
 class Natural_TTS:
     # # pip install misaki[en]
@@ -20,26 +32,54 @@ class Natural_TTS:
 
     # # pip install misaki[zh]
     # z='Mandarin Chinese',
-    def __init__(self, language = "a"):
-        self.pipeline = KPipeline(lang_code=language, repo_id='hexgrad/Kokoro-82M') # <= make sure lang_code matches voice
+    def __init__(self, language = "a", voice = "af_heart", lazy = False):
+        self.language = language # <= make sure lang_code matches voice
+        self.voice = voice # <= change voice here
+        self.pipeline = None
+        self.load_lock = threading.Lock()
+        # lazy=True defers loading the model to load() or the first synthesis
+        if not lazy:
+            self.load()
+    
+    def load(self):
+        with self.load_lock:
+            if self.pipeline is None:
+                # Imported here so processes that only talk to tts_server don't pull in torch
+                from kokoro import KPipeline
+                self.pipeline = KPipeline(lang_code=self.language, repo_id='hexgrad/Kokoro-82M')
+        return self.pipeline
     
-    def concat_audio(self, n):
-        clips = [AudioFileClip(f"{i}.mp3") for i in range(n)]
-        final_clip = concatenate_audioclips(clips)
-        final_clip.write_audiofile("./static/output/output.mp3")
-
-    def text_to_speech(self, text, vspeed=1):
-        generator = self.pipeline(
-            text, voice='af_heart', # <= change voice here
+    @property
+    def ready(self):
+        return self.pipeline is not None
+    
+    def segments(self, text, vspeed=1):
+        # Yields one float32 buffer per segment as Kokoro produces it
+        generator = (self.pipeline or self.load())(
+            text, voice=self.voice,
             speed=vspeed , split_pattern=r'\n+'
         )
-        # audio_number = len(tuple(generator))
-        # print(audio_number)
-        j = 1
-        for i, (gs, ps, audio) in enumerate(generator):
-            # print(i)  # i => index
-            # print(gs) # gs => graphemes/text
-            # print(ps) # ps => phonemes
-            sf.write(f'{i}.mp3', audio, 24000) # save each audio file
-            j = max(j, i)
-        self.concat_audio(j)
\ No newline at end of file
+        for gs, ps, audio in generator:
+            if audio is not None:
+                yield np.asarray(audio, dtype=np.float32)
+
+    def stream_speech(self, text, vspeed=1, audio_format='mp3'):
+        # Encoded audio per segment, ready to send as soon as it's synthesized.
+        # MP3 frames can simply be appended, so the chunks also concatenate
+        # into a valid file.
+        for audio in metrics.timed('tts_segment', self.segments(text, vspeed)):
+            with metrics.span('audio_encode', format=audio_format):
+                chunk = encode_audio(audio, audio_format)
+            yield chunk
+
+    def text_to_speech(self, text, output_path, vspeed=1, audio_format='mp3'):
+        # Keep every segment in memory and encode the joined audio once,
+        # instead of writing {i}.mp3 files and re-encoding them with moviepy
+        segments = list(metrics.timed('tts_segment', self.segments(text, vspeed)))
+        audio = np.concatenate(segments) if segments else np.zeros(0, dtype=np.float32)
+        # Write next to the target and rename, so readers never see a partial file
+        partial_path = f"{output_path}.part"
+        with metrics.span('audio_encode', format=audio_format):
+            sf.write(partial_path, audio, SAMPLE_RATE, format=AUDIO_FORMATS[audio_format])
+        os.replace(partial_path, output_path)
+        return output_path
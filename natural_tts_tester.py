@@ -2,4 +2,4 @@ from natural_tts import Natural_TTS
 
 tts = Natural_TTS()
 
-tts.text_to_speech("Page 1: How Would You Describe Multi/Linear to an Underclassman? Talking with underclassmen, I would frame AP Calculus BC, Multivariable Calculus, and Linear Algebra as intellectually enriching, yet demanding courses at TJ. AP Calculus BC stands out as a critical steppingstone, not just because of its intrinsic difficulty but as the entryway into more advanced coursework. It was in this class that I first encountered significant academic challenges and where I had to develop and fine-tune my study habits that I was able to apply to Multivariable Calculus and Linear Algebra. AP Calculus BC, Multivariable Calculus, and Linear Algebra, although difficult, are also incredibly rewarding and enjoyable courses. It challenged me to think critically and reinforced my passion for mathematics. The intellectual growth I experienced throughout the courses made the journey more fulfilling. Linear Algebra’s thousands of applications across various subjects, from computer science to biology, were particularly fascinating. It offers a beautiful illustration of how mathematical concepts can be transposed to diverse fields, thereby expanding your understanding and potential impact. Even though I loved almost every minute of all three courses, they were extremely challenging and require you to invest a dedicated effort. They not only hone your mathematical prowess but prepare you for a multitude of academic challenges and opportunities, bolstering your ability to succeed in whatever path you choose. It is the type of class where you get what you put in. If you pay attention and listen to the expectations of the class, it should be fine. Also, there is something to learn in every homework problem, because only a couple of the 100s of problems per section are selected. That also means that there is stuff that you can learn from problems that are in the textbook, that are not homework. I have actually been asked about this class by underclassmen. This is (approximately) what I said. Multivariable calculus is very difficult, but completely worth it. It is like BC Calculus, but in multiple dimensions. It starts with a thorough review of vectors from math 4. Then you learn partial derivatives, the multivariable version of the derivative, and multiple integrals, integrals over a region of n-dimensional space instead of just a one-dimensional interval. This all culminates in the most difficult but also the most rewarding unit of any math class I have ever taken: vector calculus. You learn all kinds of derivatives and integrals for vector fields, and powerful tools to calculate them. Vector fields appear in physics, engineering, computer science, you name it. You can even use multi to solve problems more easily in single variable calculus! Multi is insanely useful, and even though it’s hard, you’ll be fine as long as you study and make sure you understand everything conceptually instead of trying to blindly plug in formulas. These two math classes may be the most challenging math classes you have taken, but they will stretch your beliefs and views on what really is math. It may take some time for you to wrap your mind around the topics taught in class because of how hard it is to picture most of the concepts, but at the end of the class you will come out with a wealth of knowledge that can be applied. For example, the idea of flux is commonly seen in AP physics and linear algebra is seen nearly everywhere as its application are endless. Page 2: I would describe multivariable calculus as the basis for a myriad of subjects where you can finally practically put to use the math that you’ve been learning in past math classes. For example, gradient vectors and partial derivatives are used for edge detection and back propagation, respectively. I’d also describe multivariable as the best part of calculus: it makes everything come to life. Multivariable is the visual part where you unlock the 3-dimensional world with elliptic paraboloids and hyperboloids, which personally excited me since I had only known the 2D world with Calculus BC before. As for linear algebra, I would say it is like discovering an entirely new aspect of math, like the transition from geometry to calculus. It makes your mind think in completely new ways, thinking of vector subspaces and spanning sets. I would also say linear algebra is incredibly useful for real-world applications. I’ve seen matrices show up in physics with Kirchoff’s Loop Rule and in Computer Vision with perspective projections and homogenous coordinates, to name a few. I’d mention as well that linear algebra can be challenging since it has a strong emphasis on conceptual knowledge, but once you understand the basics, it all starts to click together almost like a story. For example, once you see how a solution set works, you then expand to the concepts of Spans, then finally the column space. Multivariable Calculus is a rigorous and challenging post-AP class that will expose students to the calculus topics covered in BC, but in multiple dimensions and using vectors, with an emphasis on applications. Topics covered include vector calculus, multiple integrals, and partial derivatives. I highly recommend the class for students who are interested in challenging themselves and/or are considering pursuing an education in computer science, mathematics, physics, or engineering. The class lays the foundations for essential algorithms and topics that are explored in other courses like AP Physics C: MEM, AI, Machine Learning, and Quantum Physics just to name a few. For example, I was able to grasp a much better understanding of the gradient descent and backpropagation algorithms covered in AI, which are used in training neural networks (the fundamental algorithm powering the AI revolution). I also found Multivariable Calculus very helpful for understanding topics covered in AP Physics C: Electricity and Magnetism, as flux integrals and line integrals show up quite often in derivations and problems related to magnetic and electric fields and fluxes. In summary, once you have completed the Multivariable Calculus course, you will walk away with better problem-solving skills and an understanding of some of the most important mathematical topics used to model our world.")
\ No newline at end of file
+tts.text_to_speech("Page 1: How Would You Describe Multi/Linear to an Underclassman? Talking with underclassmen, I would frame AP Calculus BC, Multivariable Calculus, and Linear Algebra as intellectually enriching, yet demanding courses at TJ. AP Calculus BC stands out as a critical steppingstone, not just because of its intrinsic difficulty but as the entryway into more advanced coursework. It was in this class that I first encountered significant academic challenges and where I had to develop and fine-tune my study habits that I was able to apply to Multivariable Calculus and Linear Algebra. AP Calculus BC, Multivariable Calculus, and Linear Algebra, although difficult, are also incredibly rewarding and enjoyable courses. It challenged me to think critically and reinforced my passion for mathematics. The intellectual growth I experienced throughout the courses made the journey more fulfilling. Linear Algebra’s thousands of applications across various subjects, from computer science to biology, were particularly fascinating. It offers a beautiful illustration of how mathematical concepts can be transposed to diverse fields, thereby expanding your understanding and potential impact. Even though I loved almost every minute of all three courses, they were extremely challenging and require you to invest a dedicated effort. They not only hone your mathematical prowess but prepare you for a multitude of academic challenges and opportunities, bolstering your ability to succeed in whatever path you choose. It is the type of class where you get what you put in. If you pay attention and listen to the expectations of the class, it should be fine. Also, there is something to learn in every homework problem, because only a couple of the 100s of problems per section are selected. That also means that there is stuff that you can learn from problems that are in the textbook, that are not homework. I have actually been asked about this class by underclassmen. This is (approximately) what I said. Multivariable calculus is very difficult, but completely worth it. It is like BC Calculus, but in multiple dimensions. It starts with a thorough review of vectors from math 4. Then you learn partial derivatives, the multivariable version of the derivative, and multiple integrals, integrals over a region of n-dimensional space instead of just a one-dimensional interval. This all culminates in the most difficult but also the most rewarding unit of any math class I have ever taken: vector calculus. You learn all kinds of derivatives and integrals for vector fields, and powerful tools to calculate them. Vector fields appear in physics, engineering, computer science, you name it. You can even use multi to solve problems more easily in single variable calculus! Multi is insanely useful, and even though it’s hard, you’ll be fine as long as you study and make sure you understand everything conceptually instead of trying to blindly plug in formulas. These two math classes may be the most challenging math classes you have taken, but they will stretch your beliefs and views on what really is math. It may take some time for you to wrap your mind around the topics taught in class because of how hard it is to picture most of the concepts, but at the end of the class you will come out with a wealth of knowledge that can be applied. For example, the idea of flux is commonly seen in AP physics and linear algebra is seen nearly everywhere as its application are endless. Page 2: I would describe multivariable calculus as the basis for a myriad of subjects where you can finally practically put to use the math that you’ve been learning in past math classes. For example, gradient vectors and partial derivatives are used for edge detection and back propagation, respectively. I’d also describe multivariable as the best part of calculus: it makes everything come to life. Multivariable is the visual part where you unlock the 3-dimensional world with elliptic paraboloids and hyperboloids, which personally excited me since I had only known the 2D world with Calculus BC before. As for linear algebra, I would say it is like discovering an entirely new aspect of math, like the transition from geometry to calculus. It makes your mind think in completely new ways, thinking of vector subspaces and spanning sets. I would also say linear algebra is incredibly useful for real-world applications. I’ve seen matrices show up in physics with Kirchoff’s Loop Rule and in Computer Vision with perspective projections and homogenous coordinates, to name a few. I’d mention as well that linear algebra can be challenging since it has a strong emphasis on conceptual knowledge, but once you understand the basics, it all starts to click together almost like a story. For example, once you see how a solution set works, you then expand to the concepts of Spans, then finally the column space. Multivariable Calculus is a rigorous and challenging post-AP class that will expose students to the calculus topics covered in BC, but in multiple dimensions and using vectors, with an emphasis on applications. Topics covered include vector calculus, multiple integrals, and partial derivatives. I highly recommend the class for students who are interested in challenging themselves and/or are considering pursuing an education in computer science, mathematics, physics, or engineering. The class lays the foundations for essential algorithms and topics that are explored in other courses like AP Physics C: MEM, AI, Machine Learning, and Quantum Physics just to name a few. For example, I was able to grasp a much better understanding of the gradient descent and backpropagation algorithms covered in AI, which are used in training neural networks (the fundamental algorithm powering the AI revolution). I also found Multivariable Calculus very helpful for understanding topics covered in AP Physics C: Electricity and Magnetism, as flux integrals and line integrals show up quite often in derivations and problems related to magnetic and electric fields and fluxes. In summary, once you have completed the Multivariable Calculus course, you will walk away with better problem-solving skills and an understanding of some of the most important mathematical topics used to model our world.", "output.mp3")
\ No newline at end of file
@@ -1,184 +1,616 @@
 import os
-import pytesseract
 from PIL import Image
 import cv2
 import numpy as np
 import logging
+import threading
+import multiprocessing
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+import pdf2image
+import metrics
+from result_cache import page_key
+from ocr_backends import get_backend, to_ocr_image
+from preprocess_graph import Variants, image_quality_score
 
-# Configure logging
-logging.basicConfig(level=logging.INFO, 
-                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 UPLOAD_FOLDER = 'uploads'
 PROCESSED_FOLDER = 'processed'
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'pdf'}
 
-# Create necessary directories
-for folder in [UPLOAD_FOLDER, PROCESSED_FOLDER]:
-    os.makedirs(folder, exist_ok=True)
-
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def comprehensive_image_processing(image_path, unique_id):
-    logger.info(f"Starting comprehensive image processing for {image_path}")
+# Processed variants are kept in memory and handed straight to Tesseract.
+# Set OCR_SAVE_PROCESSED=1 (or pass save_debug=True) to also dump them to
+# PROCESSED_FOLDER for inspection.
+SAVE_PROCESSED_IMAGES = os.environ.get('OCR_SAVE_PROCESSED', '0') == '1'
+
+def load_image(image):
+    # Accept either a path on disk, a PIL image or an OpenCV (BGR) array
+    if isinstance(image, np.ndarray):
+        return image
+    if isinstance(image, Image.Image):
+        return cv2.cvtColor(np.asarray(image.convert('RGB')), cv2.COLOR_RGB2BGR)
+    return cv2.imread(image)
+
+def save_processed_version(image, unique_id, suffix):
+    os.makedirs(PROCESSED_FOLDER, exist_ok=True)
+    path = os.path.join(PROCESSED_FOLDER, f"{unique_id}_{suffix}.png")
+    cv2.imwrite(path, image)
+    return path
+
+def comprehensive_image_processing(image, unique_id, save_debug=None, lazy=False):
+    # Processed versions of a page as (name, array) pairs. With lazy=True a
+    # Variants object is returned instead and each version is only computed
+    # when extract_best_text asks for it (see preprocess_graph).
+    if save_debug is None:
+        save_debug = SAVE_PROCESSED_IMAGES
+    source = image if isinstance(image, str) else unique_id
+    logger.info(f"Starting comprehensive image processing for {source}")
     
     # Load image with OpenCV
-    original = cv2.imread(image_path)
+    original = load_image(image)
     if original is None:
-        logger.error(f"Failed to load image at {image_path}")
+        logger.error(f"Failed to load image at {source}")
         return None
     
-    # Store different processed versions
-    processed_versions = []
-    
-    # Save the original processed version
-    original_processed = os.path.join(PROCESSED_FOLDER, f"{unique_id}_original.jpg")
-    cv2.imwrite(original_processed, original)
-    processed_versions.append(("Original", original_processed))
-    
-    # Convert to grayscale
-    gray = cv2.cvtColor(original, cv2.COLOR_BGR2GRAY)
-    
-    # 1) Basic processing - Otsu's thresholding
-    _, thresh1 = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-    basic_path = os.path.join(PROCESSED_FOLDER, f"{unique_id}_basic.jpg")
-    cv2.imwrite(basic_path, thresh1)
-    processed_versions.append(("Basic Threshold", basic_path))
-    
-    # 2) Adaptive thresholding
-    adaptive = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
-                                    cv2.THRESH_BINARY, 11, 2)
-    adaptive_path = os.path.join(PROCESSED_FOLDER, f"{unique_id}_adaptive.jpg")
-    cv2.imwrite(adaptive_path, adaptive)
-    processed_versions.append(("Adaptive Threshold", adaptive_path))
-    
-    # 3) Denoising
-    denoised = cv2.fastNlMeansDenoising(gray, None, 10, 7, 21)
-    denoise_path = os.path.join(PROCESSED_FOLDER, f"{unique_id}_denoised.jpg")
-    cv2.imwrite(denoise_path, denoised)
-    processed_versions.append(("Denoised", denoise_path))
-    
-    # 4) Denoised + Otsu
-    _, denoised_thresh = cv2.threshold(denoised, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-    denoised_thresh_path = os.path.join(PROCESSED_FOLDER, f"{unique_id}_denoised_thresh.jpg")
-    cv2.imwrite(denoised_thresh_path, denoised_thresh)
-    processed_versions.append(("Denoised + Threshold", denoised_thresh_path))
-    
-    # 5) Contrast enhancement
-    clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
-    enhanced = clahe.apply(gray)
-    enhanced_path = os.path.join(PROCESSED_FOLDER, f"{unique_id}_enhanced.jpg")
-    cv2.imwrite(enhanced_path, enhanced)
-    processed_versions.append(("Contrast Enhanced", enhanced_path))
+    save = (lambda img, suffix: save_processed_version(img, unique_id, suffix)) if save_debug else None
+    variants = Variants(original, save=save)
+    if lazy:
+        return variants
     
-    # 6) Enhanced + Otsu
-    _, enhanced_thresh = cv2.threshold(enhanced, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-    enhanced_thresh_path = os.path.join(PROCESSED_FOLDER, f"{unique_id}_enhanced_thresh.jpg")
-    cv2.imwrite(enhanced_thresh_path, enhanced_thresh)
-    processed_versions.append(("Enhanced + Threshold", enhanced_thresh_path))
-    
-    # 7) Dilation and Erosion
-    kernel = np.ones((1, 1), np.uint8)
-    dilated = cv2.dilate(gray, kernel, iterations=1)
-    eroded = cv2.erode(dilated, kernel, iterations=1)
-    morph_path = os.path.join(PROCESSED_FOLDER, f"{unique_id}_morphology.jpg")
-    cv2.imwrite(morph_path, eroded)
-    processed_versions.append(("Morphological Ops", morph_path))
-    
-    # 8) Sharpen image
-    blurred = cv2.GaussianBlur(gray, (0, 0), 3)
-    sharpened = cv2.addWeighted(gray, 1.5, blurred, -0.5, 0)
-    sharpen_path = os.path.join(PROCESSED_FOLDER, f"{unique_id}_sharpened.jpg")
-    cv2.imwrite(sharpen_path, sharpened)
-    processed_versions.append(("Sharpened", sharpen_path))
-    
-    # 9) Invert image (helps with white text on dark backgrounds)
-    inverted = cv2.bitwise_not(gray)
-    inverted_path = os.path.join(PROCESSED_FOLDER, f"{unique_id}_inverted.jpg")
-    cv2.imwrite(inverted_path, inverted)
-    processed_versions.append(("Inverted", inverted_path))
-    
-    # 10) Scale the image (helps with very small text)
-    height, width = gray.shape
-    scaled = cv2.resize(gray, (width*2, height*2), interpolation=cv2.INTER_CUBIC)
-    scaled_path = os.path.join(PROCESSED_FOLDER, f"{unique_id}_scaled.jpg")
-    cv2.imwrite(scaled_path, scaled)
-    processed_versions.append(("Scaled", scaled_path))
+    processed_versions = list(variants)
+    logger.info(f"Completed processing {len(processed_versions)} versions for {source}")
+    return processed_versions
+
+def image_pixels(image):
+    if isinstance(image, np.ndarray):
+        return image.shape[0] * image.shape[1]
+    width, height = to_ocr_image(image).size
+    return width * height
+
+# Early-exit thresholds for extract_best_text: once a variant reaches both of
+# these, the remaining (lower ranked) variants are not OCR'd at all.
+EARLY_EXIT_CONFIDENCE = float(os.environ.get('OCR_EARLY_EXIT_CONFIDENCE', 85))
+EARLY_EXIT_MIN_CHARS = int(os.environ.get('OCR_EARLY_EXIT_MIN_CHARS', 20))
+# Words Tesseract is less sure of than this are dropped as junk
+OCR_MIN_WORD_CONFIDENCE = float(os.environ.get('OCR_MIN_WORD_CONFIDENCE', 20))
+
+# Page-level parallelism: number of worker processes used by ocr_pages, and
+# the number of Tesseract calls run concurrently for the variants of one page.
+OCR_WORKERS = int(os.environ.get('OCR_WORKERS', os.cpu_count() or 1))
+OCR_VARIANT_THREADS = int(os.environ.get('OCR_VARIANT_THREADS', 1))
+
+# Layout-aware OCR: find text blocks first and OCR only those. Blocks smaller
+# than REGION_MIN_AREA of the page are ignored, and if the blocks cover more
+# than REGION_MAX_COVERAGE of the page we just OCR the whole page instead.
+OCR_LAYOUT_REGIONS = os.environ.get('OCR_LAYOUT_REGIONS', '1') == '1'
+REGION_MIN_AREA = float(os.environ.get('OCR_REGION_MIN_AREA', 0.001))
+REGION_MAX_COVERAGE = float(os.environ.get('OCR_REGION_MAX_COVERAGE', 0.85))
+
+# Streaming rasterization: pages converted per pdf2image call, and the cap on
+# pages handed to the pool but not finished yet (0 means one per worker).
+PDF_RASTER_WINDOW = int(os.environ.get('PDF_RASTER_WINDOW', 2))
+OCR_MAX_IN_FLIGHT_PAGES = int(os.environ.get('OCR_MAX_IN_FLIGHT_PAGES', 0))
+
+# The OCR worker processes are started once and shared by every job. They
+# come from a forkserver (or spawn) rather than a fork of the web server, so
+# they never inherit its threads, locks or loaded TTS model.
+OCR_START_METHOD = os.environ.get('OCR_START_METHOD', 'forkserver')
+# Times a page is resubmitted after the pool it was in broke
+OCR_BROKEN_POOL_RETRIES = int(os.environ.get('OCR_BROKEN_POOL_RETRIES', 2))
+ocr_pool = None
+ocr_pool_size = 0
+ocr_pool_lock = threading.Lock()
+
+# Threads for OCR_VARIANT_THREADS, started once per process and reused by
+# every page so their thread-local Tesseract engines stay loaded
+variant_executor = None
+variant_executor_size = 0
+variant_executor_lock = threading.Lock()
+
+def forget_executors():
+    # Threads don't survive a fork (gunicorn --preload forks after warm-up),
+    # and neither does a handle on the parent's pool: a child that reused
+    # them would wait forever on futures nobody runs. Start afresh instead.
+    global ocr_pool, ocr_pool_size, ocr_pool_lock
+    global variant_executor, variant_executor_size, variant_executor_lock
+    ocr_pool, ocr_pool_size, ocr_pool_lock = None, 0, threading.Lock()
+    variant_executor, variant_executor_size, variant_executor_lock = None, 0, threading.Lock()
+
+os.register_at_fork(after_in_child=forget_executors)
+
+# How many pages each variant has won; fed back into the ranking so variants
+# that keep winning for this deployment's documents get tried first.
+variant_wins = Counter()
+variant_wins_lock = threading.Lock()
+
+def record_variant_win(version_name):
+    with variant_wins_lock:
+        variant_wins[version_name] += 1
+
+def rank_variants(processed_versions):
+    with variant_wins_lock:
+        wins = dict(variant_wins)
+    total_wins = sum(wins.values()) or 1
+
+    def score(version):
+        name, image = version
+        quality = image_quality_score(load_image(image))
+        return quality + wins.get(name, 0) / total_wins
+
+    return sorted(processed_versions, key=score, reverse=True)
+
+def rank_variant_names(variants):
+    # rank_variants for lazy Variants: scored on the downscaled preview, so
+    # ranking computes nothing at full resolution
+    with variant_wins_lock:
+        wins = dict(variant_wins)
+    total_wins = sum(wins.values()) or 1
+    scores = variants.preview_scores()
+    return sorted(scores, key=lambda name: scores[name] + wins.get(name, 0) / total_wins, reverse=True)
+
+def ocr_version(image, psm, language):
+    backend = get_backend()
+    with metrics.span('tesseract', backend=backend.name):
+        ocr_data = backend.image_to_data(image, psm, language)
+    lines = []
+    current_line = None
+    confidence_sum = 0
+    word_count = 0
     
-    # 11) Try correcting skew
-    try:
-        thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)[1]
-        contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        contours = sorted(contours, key=cv2.contourArea, reverse=True)[:5]
-        for contour in contours:
-            rect = cv2.minAreaRect(contour)
-            angle = rect[-1]
-            if angle < -45:
-                angle = -(90 + angle)
-            else:
-                angle = -angle
-            if abs(angle) > 0.5:
-                (h, w) = gray.shape[:2]
-                center = (w // 2, h // 2)
-                M = cv2.getRotationMatrix2D(center, angle, 1.0)
-                rotated = cv2.warpAffine(gray, M, (w, h), flags=cv2.INTER_CUBIC, 
-                                        borderMode=cv2.BORDER_REPLICATE)
-                rotated_path = os.path.join(PROCESSED_FOLDER, f"{unique_id}_rotated.jpg")
-                cv2.imwrite(rotated_path, rotated)
-                processed_versions.append(("Skew Corrected", rotated_path))
-                break
-    except Exception as e:
-        logger.error(f"Skew correction failed: {str(e)}")
+    for index in range(len(ocr_data['text'])):
+        # Low-confidence words are nearly always noise (speckle, rules, edges)
+        if ocr_data['text'][index].strip() and ocr_data['conf'][index] > OCR_MIN_WORD_CONFIDENCE:
+            if ocr_data['line'][index] != current_line:
+                lines.append([])
+                current_line = ocr_data['line'][index]
+            lines[-1].append(ocr_data['text'][index])
+            confidence_sum += ocr_data['conf'][index]
+            word_count += 1
     
-    logger.info(f"Completed processing {len(processed_versions)} versions for {image_path}")
-    return processed_versions
+    # Keep Tesseract's line breaks so later stages can spot headers/footers
+    text = "\n".join(" ".join(words) for words in lines)
+    avg_confidence = confidence_sum / word_count if word_count > 0 else 0
+    return text, avg_confidence
 
-def extract_best_text(processed_versions, language='eng'):
-    logger.info(f"Starting text extraction for {len(processed_versions)} image versions")
+def get_variant_executor(threads):
+    global variant_executor, variant_executor_size
+    with variant_executor_lock:
+        if variant_executor is None or variant_executor_size < threads:
+            if variant_executor is not None:
+                variant_executor.shutdown(wait=False)
+            variant_executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="ocr-variant")
+            variant_executor_size = threads
+        return variant_executor
+
+def extract_best_text(processed_versions, language='eng', early_exit=True,
+                      min_confidence=None, min_text_length=None, stats=None,
+                      variant_threads=None):
+    if variant_threads is None:
+        variant_threads = OCR_VARIANT_THREADS
+    if min_confidence is None:
+        min_confidence = EARLY_EXIT_CONFIDENCE
+    if min_text_length is None:
+        min_text_length = EARLY_EXIT_MIN_CHARS
     
     best_text = ""
     best_confidence = 0
     best_method = ""
+    best_version = None
     
     # Try different PSM modes
     psm_modes = [6]
     
-    for version_name, img_path in processed_versions:
-        for psm in psm_modes:
+    if isinstance(processed_versions, Variants):
+        # Lazy: a variant is only computed when its batch comes up, so
+        # variants after an early exit are never built
+        names = rank_variant_names(processed_versions) if early_exit else processed_versions.names()
+        fetch = processed_versions.get
+    else:
+        if early_exit:
+            processed_versions = rank_variants(processed_versions)
+        names = [version_name for version_name, _ in processed_versions]
+        fetch = dict(processed_versions).get
+    logger.info(f"Starting text extraction for {len(names)} image versions")
+    # Each (variant, psm) pair is one Tesseract call. With variant_threads > 1
+    # the calls run in ranked batches; early exit is checked between batches.
+    attempts = [(version_name, psm) for version_name in names for psm in psm_modes]
+    total_calls = len(attempts)
+    ocr_calls = 0
+    ocr_pixels = 0
+    # Variants that turned out not to exist for this page (no small text to
+    # scale, no skew to correct) were never calls to save
+    unavailable_calls = 0
+    batch_size = max(1, variant_threads)
+    executor = get_variant_executor(batch_size) if batch_size > 1 else None
+    
+    for batch_start in range(0, total_calls, batch_size):
+        batch = [(version_name, fetch(version_name), psm)
+                 for version_name, psm in attempts[batch_start:batch_start + batch_size]]
+        unavailable_calls += sum(1 for attempt in batch if attempt[1] is None)
+        batch = [attempt for attempt in batch if attempt[1] is not None]
+        ocr_calls += len(batch)
+        ocr_pixels += sum(image_pixels(image) for _, image, _ in batch)
+        if executor:
+            futures = [executor.submit(metrics.bind(ocr_version), image, psm, language) for _, image, psm in batch]
+        else:
+            futures = None
+        
+        for index, (version_name, image, psm) in enumerate(batch):
             try:
-                custom_config = f'--psm {psm} --oem 3 -l {language} --dpi 300'
-                ocr_data = pytesseract.image_to_data(
-                    Image.open(img_path), 
-                    config=custom_config, 
-                    output_type=pytesseract.Output.DICT
-                )
-                text_parts = []
-                confidence_sum = 0
-                word_count = 0
-                
-                for index in range(len(ocr_data['text'])):
-                    if ocr_data['text'][index].strip() and ocr_data['conf'][index] > 0:
-                        text_parts.append(ocr_data['text'][index])
-                        confidence_sum += ocr_data['conf'][index]
-                        word_count += 1
-                
-                text = " ".join(text_parts)
-                avg_confidence = confidence_sum / word_count if word_count > 0 else 0
+                if futures:
+                    text, avg_confidence = futures[index].result()
+                else:
+                    text, avg_confidence = ocr_version(image, psm, language)
                 
                 if text and len(text) > len(best_text) or (len(text) == len(best_text) and avg_confidence > best_confidence):
                     best_text = text
                     best_confidence = avg_confidence
                     best_method = f"{version_name} with PSM {psm}"
+                    best_version = version_name
                     # logger.info(f"New best text found with {best_method} (Confidence: {best_confidence:.2f})")
             
             except Exception as e:
-                logger.error(f"Error extracting text from {img_path} with PSM {psm}: {str(e)}")
+                logger.error(f"Error extracting text from {version_name} with PSM {psm}: {str(e)}")
+        
+        if early_exit and best_confidence >= min_confidence and len(best_text) >= min_text_length:
+            break
+    
+    saved_calls = total_calls - unavailable_calls - ocr_calls
+    if stats is not None:
+        stats['ocr_calls'] = stats.get('ocr_calls', 0) + ocr_calls
+        stats['ocr_calls_saved'] = stats.get('ocr_calls_saved', 0) + saved_calls
+        stats['ocr_pixels'] = stats.get('ocr_pixels', 0) + ocr_pixels
+        stats['best_variant'] = best_version
+        if isinstance(processed_versions, Variants):
+            stats['preprocess_nodes'] = stats.get('preprocess_nodes', 0) + processed_versions.computed()
     
     if best_text:
-        logger.info(f"Best text extracted using {best_method} with confidence {best_confidence:.2f}")
+        record_variant_win(best_version)
+        logger.info(f"Best text extracted using {best_method} with confidence {best_confidence:.2f} "
+                    f"({ocr_calls} OCR calls, {saved_calls} saved)")
     else:
         logger.warning("No text could be extracted from any processed version")
     
-    return best_text, best_confidence, best_method
\ No newline at end of file
+    return best_text, best_confidence, best_method
+
+def merge_lines(boxes):
+    # Stack line boxes into blocks: a line joins the block above it when they
+    # overlap horizontally and the gap between them is no more than the
+    # line's own height, so a paragraph is one region however loose its
+    # leading is, while body text keeps clear of a tall banner above it
+    blocks = []
+    for x, y, w, h in sorted(boxes, key=lambda box: box[1]):
+        for block in blocks:
+            overlap = min(x + w, block['right']) - max(x, block['left'])
+            gap = y - block['bottom']
+            if overlap > 0.5 * min(w, block['right'] - block['left']) and -h / 2 < gap <= h:
+                block['left'] = min(block['left'], x)
+                block['right'] = max(block['right'], x + w)
+                block['bottom'] = max(block['bottom'], y + h)
+                break
+        else:
+            blocks.append({'left': x, 'top': y, 'right': x + w, 'bottom': y + h})
+    return [(block['left'], block['top'], block['right'] - block['left'], block['bottom'] - block['top'])
+            for block in blocks]
+
+def drop_contained(boxes):
+    # A block that grew sideways can end up covering a smaller one; OCR the
+    # outer block only, so no text is read twice
+    kept = []
+    for box in sorted(boxes, key=lambda box: box[2] * box[3], reverse=True):
+        x, y, w, h = box
+        if not any(kx <= x and ky <= y and x + w <= kx + kw and y + h <= ky + kh for kx, ky, kw, kh in kept):
+            kept.append(box)
+    return kept
+
+def reading_order(boxes):
+    # Blocks spanning most of the text width (titles, banners, single-column
+    # paragraphs) split the page into sections. Within a section, blocks are
+    # grouped into columns by horizontal overlap and read column by column,
+    # left to right, each top to bottom.
+    if not boxes:
+        return []
+    left = min(x for x, _, _, _ in boxes)
+    right = max(x + w for x, _, w, _ in boxes)
+    ordered = []
+    section = []
+
+    def flush():
+        columns = []
+        for box in sorted(section, key=lambda box: box[0]):
+            x, _, w, _ = box
+            if columns and x < columns[-1]['right']:
+                columns[-1]['boxes'].append(box)
+                columns[-1]['right'] = max(columns[-1]['right'], x + w)
+            else:
+                columns.append({'boxes': [box], 'right': x + w})
+        for column in columns:
+            ordered.extend(sorted(column['boxes'], key=lambda box: box[1]))
+        section.clear()
+
+    for box in sorted(boxes, key=lambda box: box[1]):
+        if box[2] > 0.6 * (right - left):
+            flush()
+            ordered.append(box)
+        else:
+            section.append(box)
+    flush()
+    return ordered
+
+def detect_text_regions(gray, padding=10):
+    # Find blocks of text on a grayscale page: binarize, smear neighbouring
+    # characters together into lines, then stack lines into blocks.
+    # Returns (x, y, w, h) boxes in reading order.
+    height, width = gray.shape
+    _, ink = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (max(15, width // 60), max(5, height // 200)))
+    smeared = cv2.dilate(ink, kernel, iterations=1)
+    contours, _ = cv2.findContours(smeared, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    lines = []
+    for contour in contours:
+        x, y, w, h = cv2.boundingRect(contour)
+        # Skip specks and scanner dust: almost no ink inside the box
+        if cv2.countNonZero(ink[y:y + h, x:x + w]) < 0.01 * w * h:
+            continue
+        lines.append((x, y, w, h))
+
+    boxes = []
+    min_area = height * width * REGION_MIN_AREA
+    for x, y, w, h in reading_order(drop_contained(merge_lines(lines))):
+        if w * h < min_area:
+            continue
+        x0, y0 = max(0, x - padding), max(0, y - padding)
+        x1, y1 = min(width, x + w + padding), min(height, y + h + padding)
+        boxes.append((x0, y0, x1 - x0, y1 - y0))
+    return boxes
+
+def extract_text_by_region(image, unique_id, language='eng', stats=None):
+    # OCR each detected text block separately, choosing the best variant per
+    # block, so margins and whitespace are never sent to Tesseract and a dark
+    # banner can use a different variant than the body text around it.
+    # Returns None when the layout doesn't help, so the caller can fall back
+    # to whole-page OCR.
+    original = load_image(image)
+    if original is None:
+        return None
+    gray = original if original.ndim == 2 else cv2.cvtColor(original, cv2.COLOR_BGR2GRAY)
+    regions = detect_text_regions(gray)
+    page_area = gray.shape[0] * gray.shape[1]
+    region_area = sum(w * h for _, _, w, h in regions)
+    if not regions or region_area > REGION_MAX_COVERAGE * page_area:
+        return None
+
+    texts = []
+    methods = []
+    weighted_confidence = 0
+    for index, (x, y, w, h) in enumerate(regions):
+        crop = original[y:y + h, x:x + w]
+        processed_versions = comprehensive_image_processing(crop, f"{unique_id}_region_{index}", lazy=True)
+        if not processed_versions:
+            continue
+        text, confidence, method = extract_best_text(processed_versions, language, stats=stats)
+        if text:
+            texts.append(text)
+            methods.append(method)
+            weighted_confidence += confidence * len(text)
+
+    if stats is not None:
+        stats['regions'] = len(regions)
+    total_length = sum(len(text) for text in texts)
+    confidence = weighted_confidence / total_length if total_length else 0
+    return "\n\n".join(texts), confidence, f"{len(regions)} regions ({', '.join(sorted(set(methods)))})"
+
+def process_page(page, unique_id, language='eng'):
+    # Full OCR for one page. Never raises, so one bad page can't take down the
+    # rest of the document.
+    stats = {}
+    try:
+        if OCR_LAYOUT_REGIONS:
+            result = extract_text_by_region(page, unique_id, language, stats=stats)
+            if result is not None:
+                text, confidence, method = result
+                return {'text': text, 'confidence': confidence, 'method': method, 'stats': stats, 'error': None}
+        processed_versions = comprehensive_image_processing(page, unique_id, lazy=True)
+        if not processed_versions:
+            return {'text': "", 'confidence': 0, 'method': "", 'stats': stats, 'error': "Failed to load image"}
+        text, confidence, method = extract_best_text(processed_versions, language, stats=stats)
+        return {'text': text, 'confidence': confidence, 'method': method, 'stats': stats, 'error': None}
+    except Exception as e:
+        logger.exception(f"OCR failed for {unique_id}")
+        return {'text': "", 'confidence': 0, 'method': "", 'stats': stats, 'error': str(e)}
+
+def warm_up_engine(language='eng'):
+    # Load this thread's OCR engine (and check Tesseract is installed) by
+    # reading a small blank image
+    ocr_version(np.full((64, 64), 255, dtype=np.uint8), 6, language)
+
+def warm_up_ocr(language='eng'):
+    # Engines for this process: the calling thread and, if enabled, every
+    # variant thread (engines are per thread). Also runs inside pool workers.
+    warm_up_engine(language)
+    if OCR_VARIANT_THREADS > 1:
+        executor = get_variant_executor(OCR_VARIANT_THREADS)
+        list(executor.map(warm_up_engine, [language] * OCR_VARIANT_THREADS))
+
+def warm_up_ocr_workers(language='eng'):
+    # Start the shared worker pool and load the engines in its workers, which
+    # is where PDF pages are OCR'd. The pool starts a process for each task
+    # submitted while the others are still busy, so one task per worker
+    # brings up the whole pool. Must run after any fork of this process:
+    # the pool and its forkserver can't be shared with a forked child.
+    if OCR_WORKERS <= 1:
+        return
+    pool = get_ocr_pool()
+    for future in [pool.submit(warm_up_ocr, language) for _ in range(ocr_pool_size)]:
+        future.result()
+
+def seed_variant_wins(wins):
+    # Runs in a pool worker before each page: rank with the parent's history,
+    # which is where every page's win is recorded
+    with variant_wins_lock:
+        variant_wins.clear()
+        variant_wins.update(wins)
+
+def pdf_page_count(pdf_path):
+    return pdf2image.pdfinfo_from_path(pdf_path)['Pages']
+
+def iter_pdf_pages(pdf_path, dpi=300, window=None):
+    # Rasterize a PDF a few pages at a time instead of all at once; a 300 DPI
+    # letter page is ~25 MB of RGB so the full document can easily OOM us.
+    if window is None:
+        window = PDF_RASTER_WINDOW
+    page_count = pdf_page_count(pdf_path)
+    for first_page in range(1, page_count + 1, window):
+        last_page = min(first_page + window - 1, page_count)
+        with metrics.span('rasterize'):
+            pages = pdf2image.convert_from_path(pdf_path, dpi=dpi, first_page=first_page, last_page=last_page)
+        while pages:
+            # Hand pages over one by one so we don't keep a reference to them
+            yield pages.pop(0)
+
+def get_ocr_pool(workers=None):
+    # The shared worker pool, started on first use. Grows (by replacing it)
+    # if a caller asks for more workers than it has. The old pool is not shut
+    # down, since other jobs may still be submitting to it; it winds down on
+    # its own once the last of them lets go of it.
+    global ocr_pool, ocr_pool_size
+    workers = max(workers or 1, OCR_WORKERS)
+    with ocr_pool_lock:
+        if ocr_pool is None or ocr_pool_size < workers:
+            context = multiprocessing.get_context(OCR_START_METHOD)
+            if OCR_START_METHOD == 'forkserver':
+                # Workers fork from a server that has only imported the OCR
+                # stack, so each one starts in milliseconds
+                context.set_forkserver_preload(['ocr'])
+            ocr_pool = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+            ocr_pool_size = workers
+        return ocr_pool
+
+def reset_ocr_pool(pool):
+    # A worker that dies (e.g. OOM-killed) breaks the whole pool; drop it so
+    # the next get_ocr_pool() starts a fresh one. Only the first job to see
+    # the breakage replaces it.
+    global ocr_pool
+    with ocr_pool_lock:
+        if ocr_pool is pool:
+            ocr_pool = None
+
+def process_page_traced(page, unique_id, language='eng', wins=None):
+    # process_page in a worker process: its spans travel back with the result
+    if wins is not None:
+        seed_variant_wins(wins)
+    with metrics.collect_spans() as trace:
+        result = process_page(page, unique_id, language)
+    result['spans'] = trace.spans
+    return result
+
+def collect_page_result(future, page_id):
+    try:
+        return future.result()
+    except Exception as e:
+        logger.error(f"OCR worker failed for {page_id}: {str(e)}")
+        return {'text': "", 'confidence': 0, 'method': "", 'stats': {}, 'error': str(e)}
+
+def ocr_pages(pages, unique_id, language='eng', workers=None, max_in_flight=None, on_page_done=None, cache=None):
+    # OCR every page, spreading pages across worker processes. `pages` may be
+    # a generator (see iter_pdf_pages); at most max_in_flight pages are held
+    # by the pool at once. Results come back in page order regardless of
+    # which worker finished first. on_page_done(page_num, result) is called
+    # as each page finishes, in completion order. With a ResultCache, pages
+    # seen before are answered from the cache without any OCR.
+    if workers is None:
+        workers = OCR_WORKERS
+    if max_in_flight is None:
+        max_in_flight = OCR_MAX_IN_FLIGHT_PAGES or workers
+    # The in-flight cap bounds memory, so it wins over the worker count: a
+    # document never keeps more pages in the pool than that
+    max_in_flight = max(1, max_in_flight)
+    workers = max(1, min(workers, max_in_flight))
+
+    results = {}
+    page_keys = {}
+
+    def finish(page_num, result):
+        metrics.replay(result.pop('spans', []))
+        if result['stats'].get('best_variant'):
+            record_variant_win(result['stats']['best_variant'])
+        if cache is not None and not result['error']:
+            cache.put_json(page_keys[page_num], result)
+        results[page_num] = result
+        if on_page_done:
+            on_page_done(page_num, result)
+
+    def cached(page_num, page):
+        if cache is None:
+            return False
+        page_keys[page_num] = page_key(page, language)
+        result = cache.get_json(page_keys[page_num])
+        if result is None:
+            return False
+        results[page_num] = result
+        if on_page_done:
+            on_page_done(page_num, result)
+        return True
+
+    if workers == 1:
+        for page_num, page in enumerate(pages):
+            if not cached(page_num, page):
+                result = process_page(page, f"{unique_id}_page_{page_num}", language)
+                # process_page already recorded the win in this process
+                result['stats'].pop('best_variant', None)
+                finish(page_num, result)
+        return [results[page_num] for page_num in sorted(results)]
+
+    with variant_wins_lock:
+        wins = dict(variant_wins)
+    in_flight = {}
+    broken_attempts = Counter()
+    executor = get_ocr_pool(workers)
+
+    def submit(page_num, page):
+        # The pool is shared with other jobs, so it may have been broken by
+        # any of their pages too; move to the current pool and try again
+        nonlocal executor
+        try:
+            future = executor.submit(process_page_traced, page, f"{unique_id}_page_{page_num}", language, wins)
+        except BrokenProcessPool:
+            reset_ocr_pool(executor)
+            executor = get_ocr_pool(workers)
+            future = executor.submit(process_page_traced, page, f"{unique_id}_page_{page_num}", language, wins)
+        in_flight[future] = (page_num, page)
+
+    def collect(done):
+        for future in done:
+            page_num, page = in_flight.pop(future)
+            if isinstance(future.exception(), BrokenProcessPool):
+                # Every page in the pool fails when one worker dies, not just
+                # the page that killed it: run them again on a fresh pool. A
+                # page that keeps breaking pools is given up on.
+                reset_ocr_pool(executor)
+                broken_attempts[page_num] += 1
+                if broken_attempts[page_num] <= OCR_BROKEN_POOL_RETRIES:
+                    logger.warning(f"OCR worker pool broke, retrying {unique_id}_page_{page_num}")
+                    submit(page_num, page)
+                    continue
+            finish(page_num, collect_page_result(future, f"{unique_id}_page_{page_num}"))
+
+    # This document keeps at most max_in_flight of its pages in the pool
+    for page_num, page in enumerate(pages):
+        if cached(page_num, page):
+            continue
+        while len(in_flight) >= max_in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            collect(done)
+        submit(page_num, page)
+        del page
+    while in_flight:
+        done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+        collect(done)
+
+    return [results[page_num] for page_num in sorted(results)]
@@ -0,0 +1,118 @@
+import os
+import logging
+import threading
+
+import cv2
+import numpy as np
+import pytesseract
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# 'auto' uses the persistent tesserocr engine when it is installed and falls
+# back to pytesseract otherwise; 'tesserocr' / 'pytesseract' force one
+OCR_BACKEND = os.environ.get('OCR_BACKEND', 'auto')
+OCR_DPI = 300
+
+def to_ocr_image(image):
+    # Tesseract wants RGB/grayscale; OpenCV colour arrays are BGR. Paths are
+    # still accepted so older callers keep working.
+    if isinstance(image, np.ndarray):
+        if image.ndim == 3:
+            image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        return Image.fromarray(image)
+    if isinstance(image, Image.Image):
+        return image
+    return Image.open(image)
+
+# Backends return parallel 'text', 'conf' and 'line' lists, one entry per
+# word; words sharing a 'line' value were recognized on the same text line.
+
+class PytesseractBackend:
+    # Runs the tesseract binary for every call: fork, temp image, model load
+    # and TSV parsing each time. Always available, so it is the fallback.
+    name = 'pytesseract'
+
+    def image_to_data(self, image, psm, language):
+        custom_config = f'--psm {psm} --oem 3 -l {language} --dpi {OCR_DPI}'
+        ocr_data = pytesseract.image_to_data(
+            to_ocr_image(image),
+            config=custom_config,
+            output_type=pytesseract.Output.DICT
+        )
+        lines = list(zip(ocr_data['block_num'], ocr_data['par_num'], ocr_data['line_num']))
+        return {'text': ocr_data['text'], 'conf': [float(conf) for conf in ocr_data['conf']], 'line': lines}
+
+class TesserocrBackend:
+    # Keeps an initialized libtesseract engine per language, per thread and
+    # per process (engines must not cross a fork), and feeds it image buffers
+    # directly instead of going through a temp file.
+    name = 'tesserocr'
+
+    def __init__(self):
+        import tesserocr
+        self.tesserocr = tesserocr
+        self.local = threading.local()
+
+    def engine(self, language):
+        engines = getattr(self.local, 'engines', None)
+        if engines is None or self.local.pid != os.getpid():
+            engines = self.local.engines = {}
+            self.local.pid = os.getpid()
+        if language not in engines:
+            api = self.tesserocr.PyTessBaseAPI(lang=language, oem=self.tesserocr.OEM.DEFAULT)
+            api.SetVariable('user_defined_dpi', str(OCR_DPI))
+            engines[language] = api
+        return engines[language]
+
+    def image_to_data(self, image, psm, language):
+        api = self.engine(language)
+        api.SetPageSegMode(psm)
+        if isinstance(image, np.ndarray):
+            if image.ndim == 3:
+                image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+            image = np.ascontiguousarray(image)
+            height, width = image.shape[:2]
+            channels = 1 if image.ndim == 2 else image.shape[2]
+            api.SetImageBytes(image.tobytes(), width, height, channels, width * channels)
+        else:
+            api.SetImage(to_ocr_image(image))
+        api.Recognize()
+
+        words, confidences, lines = [], [], []
+        level = self.tesserocr.RIL.WORD
+        paragraph = line = 0
+        iterator = api.GetIterator()
+        if iterator is not None:
+            for word in self.tesserocr.iterate_level(iterator, level):
+                if word.IsAtBeginningOf(self.tesserocr.RIL.PARA):
+                    paragraph += 1
+                if word.IsAtBeginningOf(self.tesserocr.RIL.TEXTLINE):
+                    line += 1
+                text = word.GetUTF8Text(level)
+                if text:
+                    words.append(text)
+                    confidences.append(word.Confidence(level))
+                    lines.append((paragraph, line))
+        api.Clear()
+        return {'text': words, 'conf': confidences, 'line': lines}
+
+backends = {}
+backends_lock = threading.Lock()
+
+def get_backend(name=None):
+    # One shared instance per backend name; engines live inside the instance
+    name = name or OCR_BACKEND
+    with backends_lock:
+        if name not in backends:
+            if name == 'pytesseract':
+                backends[name] = PytesseractBackend()
+            elif name == 'tesserocr':
+                backends[name] = TesserocrBackend()
+            else:
+                try:
+                    backends[name] = TesserocrBackend()
+                except ImportError:
+                    logger.info("tesserocr not installed, using pytesseract for OCR")
+                    backends[name] = PytesseractBackend()
+        return backends[name]
@@ -0,0 +1,142 @@
+import os
+import time
+import queue
+import logging
+import threading
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Items allowed to wait between two stages before the upstream stage blocks
+PIPELINE_QUEUE_SIZE = int(os.environ.get('PIPELINE_QUEUE_SIZE', 4))
+
+DONE = object()
+
+class Stage:
+    # One worker thread. handler(item, emit) processes an item and calls
+    # emit(result) for anything it passes downstream; flush(emit), if given,
+    # runs once after the last item.
+    def __init__(self, name, handler, flush=None, queue_size=PIPELINE_QUEUE_SIZE):
+        self.name = name
+        self.handler = handler
+        self.flush = flush
+        self.inbox = queue.Queue(maxsize=queue_size)
+        self.items = 0
+        self.busy = 0.0
+        self.blocked = 0.0
+        self.queue_wait = 0.0
+        self.max_queue_wait = 0.0
+        self.started = None
+        self.finished = None
+
+    def stats(self):
+        elapsed = (self.finished or time.monotonic()) - (self.started or time.monotonic())
+        return {
+            'items': self.items,
+            'busy_seconds': round(self.busy, 3),
+            'blocked_seconds': round(self.blocked, 3),
+            'utilization': round(self.busy / elapsed, 3) if elapsed > 0 else 0,
+            'queue_wait_avg_seconds': round(self.queue_wait / self.items, 3) if self.items else 0,
+            'queue_wait_max_seconds': round(self.max_queue_wait, 3),
+        }
+
+class Pipeline:
+    # Producer/consumer chain: source(emit) feeds the first stage, and each
+    # stage feeds the next through a bounded queue, so a slow stage pushes
+    # back on the ones before it. All stages run at the same time; items keep
+    # their order because every stage is a single thread.
+    def __init__(self, source_name, source, stages):
+        self.source = Stage(source_name, None)
+        self.source_fn = source
+        self.stages = stages
+        self.error = None
+
+    def emitter(self, stage, next_stage):
+        def emit(item):
+            start = time.monotonic()
+            if next_stage is not None:
+                next_stage.inbox.put((item, time.monotonic()))
+            stage.blocked += time.monotonic() - start
+        return emit
+
+    def run_source(self):
+        stage = self.source
+        first = self.stages[0] if self.stages else None
+        stage.started = time.monotonic()
+        emit = self.emitter(stage, first)
+
+        def counted(item):
+            # Stop producing once a later stage has failed
+            if self.error is not None:
+                raise self.error
+            stage.items += 1
+            emit(item)
+
+        try:
+            self.source_fn(counted)
+        except Exception as e:
+            logger.exception("Pipeline source failed")
+            self.error = self.error or e
+        finally:
+            stage.finished = time.monotonic()
+            stage.busy = stage.finished - stage.started - stage.blocked
+            if first is not None:
+                first.inbox.put(DONE)
+
+    def run_stage(self, index):
+        stage = self.stages[index]
+        next_stage = self.stages[index + 1] if index + 1 < len(self.stages) else None
+        emit = self.emitter(stage, next_stage)
+        stage.started = time.monotonic()
+        while True:
+            item = stage.inbox.get()
+            if item is DONE:
+                break
+            payload, queued_at = item
+            waited = time.monotonic() - queued_at
+            stage.queue_wait += waited
+            stage.max_queue_wait = max(stage.max_queue_wait, waited)
+            stage.items += 1
+            if self.error is not None:
+                # Something upstream or downstream failed: keep draining so
+                # nobody stays blocked on a full queue, but do no more work
+                continue
+            blocked_before = stage.blocked
+            start = time.monotonic()
+            try:
+                stage.handler(payload, emit)
+            except Exception as e:
+                logger.exception(f"Pipeline stage '{stage.name}' failed")
+                self.error = self.error or e
+            stage.busy += time.monotonic() - start - (stage.blocked - blocked_before)
+        if stage.flush is not None and self.error is None:
+            blocked_before = stage.blocked
+            start = time.monotonic()
+            try:
+                stage.flush(emit)
+            except Exception as e:
+                logger.exception(f"Pipeline stage '{stage.name}' failed")
+                self.error = self.error or e
+            stage.busy += time.monotonic() - start - (stage.blocked - blocked_before)
+        stage.finished = time.monotonic()
+        if next_stage is not None:
+            next_stage.inbox.put(DONE)
+
+    def run(self):
+        # Stage threads work for the caller's job, so they share its trace
+        threads = [threading.Thread(target=metrics.bind(self.run_source), daemon=True, name="pipeline-source")]
+        threads += [threading.Thread(target=metrics.bind(self.run_stage), args=(index,), daemon=True, name=f"pipeline-{stage.name}")
+                    for index, stage in enumerate(self.stages)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if self.error is not None:
+            raise self.error
+        return self.stats()
+
+    def stats(self):
+        stats = {self.source.name: self.source.stats()}
+        stats.update({stage.name: stage.stats() for stage in self.stages})
+        return stats
@@ -0,0 +1,230 @@
+import os
+import time
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+import metrics
+
+# Width of the downscaled copy used to rank variants before any of them is
+# computed at full resolution
+PREVIEW_WIDTH = int(os.environ.get('OCR_PREVIEW_WIDTH', 800))
+# Median character height (full-resolution pixels) below which the "Scaled"
+# variant upscales the page; Tesseract wants an x-height of ~20px
+SMALL_TEXT_HEIGHT = float(os.environ.get('OCR_SMALL_TEXT_HEIGHT', 20))
+# Images narrower than the preview width (text regions) are ranked at half
+# size, unless that would be narrower than this; tinier crops are ranked as is
+PREVIEW_MIN_WIDTH = 150
+# Skew is estimated on an ink mask no wider than this
+SKEW_ESTIMATE_WIDTH = 1000
+
+def to_gray(image):
+    return image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+def otsu(gray):
+    return cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)[1]
+
+def adaptive_threshold(gray):
+    return cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2)
+
+def denoise(gray):
+    return cv2.fastNlMeansDenoising(gray, None, 10, 7, 21)
+
+def enhance_contrast(gray):
+    return cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8)).apply(gray)
+
+def remove_specks(gray):
+    # Dilate then erode (a closing) with a 2x2 kernel: drops dark specks a
+    # pixel wide while leaving text strokes alone
+    return cv2.morphologyEx(gray, cv2.MORPH_CLOSE, np.ones((2, 2), np.uint8))
+
+def sharpen(gray):
+    blurred = cv2.GaussianBlur(gray, (0, 0), 3)
+    return cv2.addWeighted(gray, 1.5, blurred, -0.5, 0)
+
+def text_height(ink, scale):
+    # Median height of the ink blobs (roughly the x-height), converted back
+    # to full-resolution pixels so previews make the same decisions
+    _, _, stats, _ = cv2.connectedComponentsWithStats(ink, connectivity=8)
+    heights = stats[1:, cv2.CC_STAT_HEIGHT]
+    heights = heights[(heights > 2) & (heights < ink.shape[0] / 10)]
+    return float(np.median(heights)) / scale if len(heights) else None
+
+def upscale_small_text(gray, height):
+    # Only worth the extra pixels when the text is small; at 300 DPI body
+    # text is already big enough and this variant is skipped
+    if not height or height >= SMALL_TEXT_HEIGHT:
+        return None
+    factor = min(2.0, SMALL_TEXT_HEIGHT / height)
+    if factor < 1.25:
+        return None
+    rows, cols = gray.shape
+    return cv2.resize(gray, (int(cols * factor), int(rows * factor)), interpolation=cv2.INTER_CUBIC)
+
+def skew_angle(ink):
+    # One minAreaRect over all ink on a downscaled, despeckled mask, rather
+    # than one per contour at full size. Returns degrees in [-45, 45].
+    height, width = ink.shape
+    if width > SKEW_ESTIMATE_WIDTH:
+        ink = cv2.resize(ink, (SKEW_ESTIMATE_WIDTH, max(1, int(height * SKEW_ESTIMATE_WIDTH / width))),
+                         interpolation=cv2.INTER_NEAREST)
+    ink = cv2.morphologyEx(ink, cv2.MORPH_OPEN, np.ones((2, 2), np.uint8))
+    coords = cv2.findNonZero(ink)
+    if coords is None or len(coords) < 10:
+        return 0.0
+    angle = cv2.minAreaRect(coords)[-1]
+    # OpenCV reports (0, 90] or [-90, 0) depending on version; fold both
+    if angle > 45:
+        angle -= 90
+    elif angle < -45:
+        angle += 90
+    return angle
+
+def deskew(gray, angle):
+    if abs(angle) <= 0.5:
+        return None
+    height, width = gray.shape
+    matrix = cv2.getRotationMatrix2D((width // 2, height // 2), angle, 1.0)
+    return cv2.warpAffine(gray, matrix, (width, height), flags=cv2.INTER_CUBIC, borderMode=cv2.BORDER_REPLICATE)
+
+def image_quality_score(image):
+    # Cheap proxy for how OCR-friendly a variant is: high global contrast,
+    # little pixel noise and a small skew estimate. Computed on a downscaled
+    # copy so it costs a fraction of a Tesseract pass.
+    gray = to_gray(image)
+    height, width = gray.shape
+    if width > 800:
+        gray = cv2.resize(gray, (800, max(1, int(height * 800 / width))), interpolation=cv2.INTER_AREA)
+
+    contrast = gray.std() / 128.0
+    noise = cv2.absdiff(gray, cv2.medianBlur(gray, 3)).mean() / 255.0
+
+    skew = 0.0
+    _, ink = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    coords = cv2.findNonZero(ink)
+    if coords is not None and len(coords) > 10:
+        angle = cv2.minAreaRect(coords)[-1]
+        skew = min(abs(angle) % 90, 90 - abs(angle) % 90) / 45.0
+
+    return contrast - 2.0 * noise - 0.5 * skew
+
+# The preprocessing DAG. 'original' (the loaded page) and 'scale' (its size
+# relative to the full-resolution page) are seeded; every other node is
+# op(*inputs). A node whose op returns None, or that depends on one that did,
+# is unavailable for this page.
+Node = namedtuple('Node', ['inputs', 'op'])
+
+NODES = {
+    'gray': Node(('original',), to_gray),
+    'otsu': Node(('gray',), otsu),
+    'ink': Node(('otsu',), cv2.bitwise_not),
+    'adaptive': Node(('gray',), adaptive_threshold),
+    'denoised': Node(('gray',), denoise),
+    'denoised_otsu': Node(('denoised',), otsu),
+    'enhanced': Node(('gray',), enhance_contrast),
+    'enhanced_otsu': Node(('enhanced',), otsu),
+    'despeckled': Node(('gray',), remove_specks),
+    'sharpened': Node(('gray',), sharpen),
+    'inverted': Node(('gray',), cv2.bitwise_not),
+    'text_height': Node(('ink', 'scale'), text_height),
+    'scaled': Node(('gray', 'text_height'), upscale_small_text),
+    'skew_angle': Node(('ink',), skew_angle),
+    'deskewed': Node(('gray', 'skew_angle'), deskew),
+}
+
+# (variant name, node, debug file suffix), in the order they used to be built
+VARIANTS = [
+    ("Original", 'original', 'original'),
+    ("Basic Threshold", 'otsu', 'basic'),
+    ("Adaptive Threshold", 'adaptive', 'adaptive'),
+    ("Denoised", 'denoised', 'denoised'),
+    ("Denoised + Threshold", 'denoised_otsu', 'denoised_thresh'),
+    ("Contrast Enhanced", 'enhanced', 'enhanced'),
+    ("Enhanced + Threshold", 'enhanced_otsu', 'enhanced_thresh'),
+    ("Morphological Ops", 'despeckled', 'morphology'),
+    ("Sharpened", 'sharpened', 'sharpened'),
+    ("Inverted", 'inverted', 'inverted'),
+    ("Scaled", 'scaled', 'scaled'),
+    ("Skew Corrected", 'deskewed', 'rotated'),
+]
+
+class PreprocessGraph:
+    # Evaluates NODES for one image on demand. Each node is computed at most
+    # once and shared by everything downstream of it (Otsu runs once for
+    # "Basic Threshold", the ink mask and skew detection).
+    def __init__(self, image, scale=1.0, resolution='full'):
+        self.values = {'original': image, 'scale': scale}
+        self.resolution = resolution
+        self.timings = {}
+
+    def get(self, node):
+        if node not in self.values:
+            spec = NODES[node]
+            inputs = [self.get(name) for name in spec.inputs]
+            value = None
+            if all(item is not None for item in inputs):
+                start = time.perf_counter()
+                value = spec.op(*inputs)
+                self.timings[node] = time.perf_counter() - start
+                metrics.record('preprocess', self.timings[node], node=node, resolution=self.resolution)
+            self.values[node] = value
+        return self.values[node]
+
+class Variants:
+    # The processed versions of one page, computed only when asked for.
+    # Iterating yields every available (name, image) pair at full resolution,
+    # which is what comprehensive_image_processing has always returned.
+    # save(image, suffix), if given, is called once per computed variant.
+    def __init__(self, image, save=None, preview_width=None):
+        self.graph = PreprocessGraph(image)
+        self.save = save
+        self.saved = set()
+        self.preview_width = preview_width or PREVIEW_WIDTH
+        self.scores = None
+        self.nodes = {name: node for name, node, _ in VARIANTS}
+        self.suffixes = {name: suffix for name, _, suffix in VARIANTS}
+
+    def names(self):
+        return [name for name, _, _ in VARIANTS]
+
+    def get(self, name):
+        image = self.graph.get(self.nodes[name])
+        if image is not None and self.save and name not in self.saved:
+            self.saved.add(name)
+            self.save(image, self.suffixes[name])
+        return image
+
+    def __iter__(self):
+        for name in self.names():
+            image = self.get(name)
+            if image is not None:
+                yield name, image
+
+    def preview(self):
+        # Same graph on a copy at most preview_width wide. Smaller images (text
+        # regions) are halved, so ranking doesn't run every node (denoise
+        # especially) at full size; only tiny crops are their own preview.
+        original = self.graph.get('original')
+        height, width = original.shape[:2]
+        target = self.preview_width if width > self.preview_width else width // 2
+        if target < PREVIEW_MIN_WIDTH:
+            return self.graph
+        scale = target / width
+        small = cv2.resize(original, (target, max(1, int(height * scale))), interpolation=cv2.INTER_AREA)
+        return PreprocessGraph(small, scale, resolution='preview')
+
+    def preview_scores(self):
+        # Estimated quality of every available variant, from the preview only
+        if self.scores is None:
+            preview = self.preview()
+            self.scores = {}
+            for name in self.names():
+                image = preview.get(self.nodes[name])
+                if image is not None:
+                    self.scores[name] = image_quality_score(image)
+        return self.scores
+
+    def computed(self):
+        # Full-resolution nodes evaluated so far
+        return len(self.graph.timings)
@@ -0,0 +1,158 @@
+import os
+import json
+import hashlib
+import logging
+import tempfile
+import threading
+from collections import Counter
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+CACHE_FOLDER = os.environ.get('RESULT_CACHE_FOLDER', 'cache')
+# Total size of everything in CACHE_FOLDER before least recently used entries are evicted
+CACHE_MAX_BYTES = int(os.environ.get('RESULT_CACHE_MAX_BYTES', 2 * 1024 ** 3))
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def document_key(path, language):
+    return f"doc-{hash_file(path)}-{language}"
+
+def page_key(page, language):
+    # Pages are keyed by their rendered pixels so a PDF with one edited page
+    # still reuses the OCR for all the others
+    if isinstance(page, str):
+        return f"page-{hash_file(page)}-{language}"
+    pixels = np.asarray(page)
+    digest = hashlib.sha256(str(pixels.shape).encode())
+    digest.update(np.ascontiguousarray(pixels).data)
+    return f"page-{digest.hexdigest()}-{language}"
+
+def audio_key(chunk_id, voice, speed):
+    # Audio is cached per text chunk (see text_normalize.chunk_text, whose ids
+    # are hashes of the normalized chunk text), so documents that share
+    # sentences share synthesized audio
+    return f"audio-{chunk_id}-{voice}-{speed}"
+
+class ResultCache:
+    # Content-addressed, size-bounded LRU cache on disk. Entry mtimes are the
+    # recency clock: every hit touches the file and eviction removes the
+    # oldest entries first.
+    def __init__(self, folder=CACHE_FOLDER, max_bytes=CACHE_MAX_BYTES):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.hits = Counter()
+        self.misses = Counter()
+        self.lock = threading.Lock()
+        os.makedirs(folder, exist_ok=True)
+        # Running size of the cache, so a store only rescans the folder once
+        # it goes over max_bytes. Other processes sharing the folder aren't
+        # counted until the next rescan, which also corrects any drift.
+        self.total_bytes = sum(size for _, size, _ in self.scan())
+
+    def path(self, key, extension):
+        return os.path.join(self.folder, f"{key}.{extension}")
+
+    def lookup(self, kind, path):
+        if os.path.exists(path):
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+            self.hits[kind] += 1
+            return True
+        self.misses[kind] += 1
+        return False
+
+    def store(self, path, write):
+        # Write to a temp file and rename so readers never see a partial entry
+        fd, temp_path = tempfile.mkstemp(dir=self.folder, suffix='.tmp')
+        os.close(fd)
+        try:
+            write(temp_path)
+            size = os.path.getsize(temp_path)
+            replaced = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(temp_path, path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        with self.lock:
+            self.total_bytes += size - replaced
+            over = self.total_bytes > self.max_bytes
+        if over:
+            self.evict()
+
+    def get_json(self, key):
+        kind = key.split('-', 1)[0]
+        path = self.path(key, 'json')
+        if not self.lookup(kind, path):
+            return None
+        try:
+            with open(path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            logger.warning(f"Discarding unreadable cache entry {key}")
+            return None
+
+    def put_json(self, key, value):
+        def write(temp_path):
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(value, f)
+        self.store(self.path(key, 'json'), write)
+
+    def get_bytes(self, key, extension):
+        path = self.path(key, extension)
+        if not self.lookup(key.split('-', 1)[0], path):
+            return None
+        try:
+            with open(path, 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def put_bytes(self, key, extension, data):
+        def write(temp_path):
+            with open(temp_path, 'wb') as f:
+                f.write(data)
+        self.store(self.path(key, extension), write)
+
+    def scan(self):
+        # (mtime, size, path) of every entry
+        entries = []
+        for entry in os.scandir(self.folder):
+            if entry.is_file() and not entry.name.endswith('.tmp'):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def evict(self):
+        with self.lock:
+            entries = self.scan()
+            total = sum(size for _, size, _ in entries)
+            self.total_bytes = total
+            if total <= self.max_bytes:
+                return
+            entries.sort()
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except OSError:
+                    pass
+            self.total_bytes = total
+            logger.info(f"Evicted cache entries down to {total} bytes")
+
+    def stats(self):
+        kinds = set(self.hits) | set(self.misses)
+        return {kind: {'hits': self.hits[kind], 'misses': self.misses[kind]} for kind in sorted(kinds)}
@@ -0,0 +1,350 @@
+"""Offline, CPU-only benchmark and regression suite.
+
+Generates synthetic fixtures (degraded scanned pages, multi-page PDFs and text
+corpora), then times:
+
+  preprocess  comprehensive_image_processing per page
+  ocr         extract_best_text per page, with character accuracy per degradation
+  flask       the /file route end to end through the Flask test client
+  tts         Natural_TTS.stream_speech / text_to_speech
+
+Each section runs in a fresh process so its peak RSS is its own. Results
+(throughput, p50/p95 latency, peak RSS, accuracy) are written to JSON; pass a
+previous run with --baseline to fail on regressions.
+
+The TTS model is replaced by a stub that returns a tone of plausible length, so
+the numbers cover our own encoding/streaming code; --kokoro uses the real model.
+
+Usage: python test_units/benchmark_suite.py [--quick] [--out bench.json] [--baseline old.json]
+Run from the repository root.
+"""
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import resource
+import subprocess
+import multiprocessing
+
+import cv2
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from synthetic_pages import DEGRADATIONS, degrade, render_page, text_corpus, write_pdf
+
+SECTIONS = ('preprocess', 'ocr', 'flask', 'tts')
+# A metric is a regression when it is this much worse than the baseline
+LATENCY_TOLERANCE = 0.20
+RSS_TOLERANCE = 0.20
+ACCURACY_TOLERANCE = 0.02
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    if not values:
+        return 0
+    index = min(len(values) - 1, max(0, int(round(fraction * (len(values) - 1)))))
+    return values[index]
+
+
+def summarize(times, items=None):
+    # Latency percentiles for a list of per-item timings, plus throughput
+    total = sum(times)
+    return {
+        'count': len(times),
+        'total_seconds': round(total, 4),
+        'p50_seconds': round(percentile(times, 0.50), 4),
+        'p95_seconds': round(percentile(times, 0.95), 4),
+        'throughput_per_second': round((items or len(times)) / total, 3) if total else 0,
+    }
+
+
+def char_accuracy(text, truth):
+    # 1 - character error rate (Levenshtein distance / truth length), with
+    # whitespace collapsed so line wrapping differences don't count
+    text, truth = " ".join(text.split()), " ".join(truth.split())
+    if not truth:
+        return 1.0 if not text else 0.0
+    previous = list(range(len(text) + 1))
+    for i, truth_char in enumerate(truth, 1):
+        current = [i]
+        for j, text_char in enumerate(text, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (truth_char != text_char)))
+        previous = current
+    return max(0.0, 1 - previous[-1] / len(truth))
+
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+class StubPipeline:
+    # Stands in for kokoro.KPipeline: yields (graphemes, phonemes, audio) per
+    # line with ~60 ms of tone per character, like real speech length
+    def __call__(self, text, voice=None, speed=1, split_pattern=r'\n+'):
+        for piece in text.split("\n"):
+            if piece.strip():
+                samples = int(24000 * 0.06 * len(piece) / speed)
+                yield piece, None, 0.1 * np.sin(np.arange(samples, dtype=np.float32) * 0.05)
+
+
+def make_tts(use_kokoro):
+    from natural_tts import Natural_TTS
+    if use_kokoro:
+        return Natural_TTS()
+    tts = Natural_TTS.__new__(Natural_TTS)
+    tts.voice = 'af_heart'
+    tts.pipeline = StubPipeline()
+    return tts
+
+
+def make_fixtures(folder, pages, dpi):
+    # Labeled page images for every degradation, PDFs and a text corpus
+    fixtures = {'pages': [], 'pdfs': [], 'corpus': []}
+    for seed in range(pages):
+        image, truth = render_page(seed, dpi=dpi, figure=False)
+        for kind in DEGRADATIONS:
+            path = os.path.join(folder, f"page_{seed}_{kind}.png")
+            cv2.imwrite(path, degrade(image, kind, seed))
+            fixtures['pages'].append({'path': path, 'kind': kind, 'truth': truth})
+    for seed in range(2):
+        rendered = [render_page(100 + seed * 10 + n, dpi=dpi, figure=n % 2 == 1) for n in range(3)]
+        path = write_pdf([degrade(image, 'noise', n) for n, (image, _) in enumerate(rendered)],
+                         os.path.join(folder, f"document_{seed}.pdf"), dpi=dpi)
+        fixtures['pdfs'].append({'path': path, 'truth': [truth for _, truth in rendered]})
+    fixtures['corpus'] = [text_corpus(seed, paragraphs=3 + seed) for seed in range(4)]
+    return fixtures
+
+
+def bench_preprocess(fixtures, options):
+    from ocr import comprehensive_image_processing, load_image
+    times, variants = [], 0
+    for page in fixtures['pages']:
+        image = load_image(page['path'])
+        start = time.perf_counter()
+        versions = comprehensive_image_processing(image, "bench", save_debug=False)
+        times.append(time.perf_counter() - start)
+        variants += len(versions)
+    result = summarize(times)
+    result['variants_per_page'] = round(variants / max(1, len(times)), 2)
+    return result
+
+
+def bench_ocr(fixtures, options):
+    from ocr import comprehensive_image_processing, extract_best_text, load_image
+    times, calls = [], 0
+    accuracy = {}
+    for page in fixtures['pages']:
+        versions = comprehensive_image_processing(load_image(page['path']), "bench", save_debug=False)
+        stats = {}
+        start = time.perf_counter()
+        text, confidence, method = extract_best_text(versions, stats=stats)
+        times.append(time.perf_counter() - start)
+        calls += stats.get('ocr_calls', 0)
+        accuracy.setdefault(page['kind'], []).append(char_accuracy(text, page['truth']))
+    result = summarize(times)
+    result['ocr_calls_per_page'] = round(calls / max(1, len(times)), 2)
+    result['char_accuracy'] = {kind: round(sum(scores) / len(scores), 4) for kind, scores in accuracy.items()}
+    result['char_accuracy_mean'] = round(float(np.mean([score for scores in accuracy.values() for score in scores])), 4)
+    return result
+
+
+def bench_flask(fixtures, options):
+    # No background model warm-up: the stub replaces the TTS right after import
+    os.environ['WARMUP_MODELS'] = '0'
+    import app as server
+    from result_cache import ResultCache
+    server.tts = make_tts(options['kokoro'])
+    server.cache = ResultCache(tempfile.mkdtemp())
+    client = server.app.test_client()
+
+    times, first_text, pages, accuracy = [], [], 0, []
+    for document in fixtures['pdfs']:
+        start = time.perf_counter()
+        with open(document['path'], 'rb') as f:
+            response = client.post('/file', data={'file': (f, os.path.basename(document['path']))},
+                                   content_type='multipart/form-data')
+        job_id = re.search(r'/jobs/([0-9a-f-]{36})', response.get_data(as_text=True)).group(1)
+        ready = None
+        while True:
+            status = client.get(f'/jobs/{job_id}').get_json()
+            if ready is None and status.get('transcription_ready'):
+                ready = time.perf_counter() - start
+            if status['stage'] in ('done', 'failed'):
+                break
+            time.sleep(0.02)
+        times.append(time.perf_counter() - start)
+        first_text.append(ready if ready is not None else times[-1])
+        if status['stage'] == 'failed':
+            raise RuntimeError(f"Job failed: {status['error']}")
+        pages += len(document['truth'])
+        accuracy.append(char_accuracy(status['result']['transcription'], "\n".join(document['truth'])))
+        for name in (status['result']['audio'], status['result']['pdf']):
+            os.remove(os.path.join(server.OUTPUT_FOLDER, name))
+
+    result = summarize(times)
+    result['pages_per_second'] = round(pages / sum(times), 3) if sum(times) else 0
+    result['transcription_ready_p50_seconds'] = round(percentile(first_text, 0.50), 4)
+    # Includes the "Page N:" headings, so it sits a little below the OCR number
+    result['char_accuracy_mean'] = round(float(np.mean(accuracy)), 4)
+    return result
+
+
+def bench_tts(fixtures, options):
+    tts = make_tts(options['kokoro'])
+    for _ in tts.stream_speech("Warm up."):
+        pass
+    first_chunk, stream_times, file_times, characters = [], [], [], 0
+    output = os.path.join(tempfile.mkdtemp(), "bench.mp3")
+    for text in fixtures['corpus']:
+        start = time.perf_counter()
+        first = None
+        for _ in tts.stream_speech(text):
+            first = first or time.perf_counter() - start
+        stream_times.append(time.perf_counter() - start)
+        first_chunk.append(first or stream_times[-1])
+
+        start = time.perf_counter()
+        tts.text_to_speech(text, output_path=output)
+        file_times.append(time.perf_counter() - start)
+        characters += len(text)
+    result = {'stream_speech': summarize(stream_times), 'text_to_speech': summarize(file_times)}
+    result['stream_speech']['first_chunk_p50_seconds'] = round(percentile(first_chunk, 0.50), 4)
+    result['characters_per_second'] = round(characters / sum(stream_times), 1)
+    result['model'] = 'kokoro' if options['kokoro'] else 'stub'
+    return result
+
+
+def run_section(name, fixtures, options, results):
+    try:
+        start = time.perf_counter()
+        result = globals()[f"bench_{name}"](fixtures, options)
+        result['wall_seconds'] = round(time.perf_counter() - start, 3)
+    except Exception as e:
+        result = {'error': f"{type(e).__name__}: {e}"}
+    result['peak_rss_mb'] = peak_rss_mb()
+    results.put(result)
+
+
+def isolated(name, fixtures, options):
+    # Fresh interpreter per section so peak RSS isn't inherited
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    process = context.Process(target=run_section, args=(name, fixtures, options, results))
+    process.start()
+    result = results.get()
+    process.join()
+    return result
+
+
+def flatten(result, prefix=""):
+    for key, value in result.items():
+        if isinstance(value, dict):
+            yield from flatten(value, f"{prefix}{key}.")
+        elif isinstance(value, (int, float)):
+            yield f"{prefix}{key}", value
+
+
+# Runs are only comparable when they OCR'd the same fixtures
+COMPARABLE_META = ('dpi', 'pages_per_degradation')
+
+
+def mismatched_meta(results, baseline):
+    before = baseline.get('meta', {})
+    return [f"{key}: baseline {before.get(key)}, this run {results['meta'][key]}"
+            for key in COMPARABLE_META if before.get(key) != results['meta'][key]]
+
+
+def regressions(results, baseline):
+    # Compare latency, memory and accuracy against a previous run
+    found = []
+    for section, result in results['sections'].items():
+        before = dict(flatten(baseline.get('sections', {}).get(section, {})))
+        for metric, value in flatten(result):
+            if metric not in before or not before[metric]:
+                continue
+            old = before[metric]
+            leaf = metric.rsplit('.', 1)[-1]
+            if '_p50_' in f"_{leaf}" or '_p95_' in f"_{leaf}":
+                worse = value > old * (1 + LATENCY_TOLERANCE)
+            elif metric == 'peak_rss_mb':
+                worse = value > old * (1 + RSS_TOLERANCE)
+            elif 'char_accuracy' in metric:
+                worse = value < old - ACCURACY_TOLERANCE
+            else:
+                continue
+            if worse:
+                found.append(f"{section}.{metric}: {old} -> {value}")
+    return found
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--quick', action='store_true', help="one page per degradation at 150 DPI")
+    parser.add_argument('--pages', type=int, default=3, help="pages rendered per degradation")
+    parser.add_argument('--sections', nargs='*', default=list(SECTIONS), choices=SECTIONS)
+    parser.add_argument('--kokoro', action='store_true', help="use the real Kokoro model instead of the stub")
+    parser.add_argument('--out', default='bench_results.json')
+    parser.add_argument('--baseline', help="previous results JSON to compare against")
+    args = parser.parse_args()
+
+    pages, dpi = (1, 150) if args.quick else (args.pages, 300)
+    fixtures = make_fixtures(tempfile.mkdtemp(prefix="readdf-bench-"), pages, dpi)
+    options = {'kokoro': args.kokoro}
+
+    results = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'machine': platform.platform(),
+            'cpus': os.cpu_count(),
+            'pages_per_degradation': pages,
+            'dpi': dpi,
+        },
+        'sections': {},
+    }
+    # Check the baseline first rather than after a long run
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        mismatched = mismatched_meta(results, baseline)
+        if mismatched:
+            for line in mismatched:
+                print(f"NOT COMPARABLE {line}")
+            return 2
+    for name in args.sections:
+        print(f"running {name}...", flush=True)
+        results['sections'][name] = isolated(name, fixtures, options)
+        print(json.dumps(results['sections'][name], indent=2), flush=True)
+
+    with open(args.out, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"wrote {args.out}")
+
+    if args.baseline:
+        found = regressions(results, baseline)
+        for line in found:
+            print(f"REGRESSION {line}")
+        return 1 if found else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,46 @@
+"""Synthesis latency versus TTS chunk size.
+
+For each maximum chunk size, chunks the natural_tts_tester.py text with
+text_normalize.chunk_text and synthesizes the chunks one by one, reporting
+time to first audio, slowest single chunk and total time.
+
+Usage: python test_units/chunk_size_benchmark.py [size ...]
+Run from the repository root.
+"""
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from natural_tts import Natural_TTS
+from text_normalize import chunk_text, normalize_text
+
+
+def tester_text():
+    source = open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'natural_tts_tester.py')).read()
+    return re.search(r'text_to_speech\("(.*)", "[^"]*"\)', source, re.S).group(1)
+
+
+def run(sizes):
+    tts = Natural_TTS()
+    for _ in tts.segments("Warm up."):
+        pass
+    text = normalize_text(tester_text())
+
+    for size in sizes:
+        chunks = chunk_text(text, size)
+        latencies = []
+        start = time.perf_counter()
+        for chunk in chunks:
+            chunk_start = time.perf_counter()
+            for _ in tts.segments(chunk['text']):
+                pass
+            latencies.append(time.perf_counter() - chunk_start)
+        total = time.perf_counter() - start
+        print(f"max {size:5d} chars: {len(chunks):3d} chunks  first audio {latencies[0]:6.2f}s  "
+              f"slowest chunk {max(latencies):6.2f}s  total {total:6.2f}s")
+
+
+if __name__ == '__main__':
+    run([int(size) for size in sys.argv[1:]] or [100, 200, 300, 500, 1000, 2000])
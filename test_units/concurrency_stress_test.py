@@ -0,0 +1,102 @@
+"""Fires N uploads at /file in parallel and checks that every job gets back
+its own audio, not another request's or a half-written file.
+
+OCR and the Kokoro model are replaced with fakes that derive the "text" and
+"audio" from the uploaded bytes, so the check is exact and runs quickly.
+
+Usage: python test_units/concurrency_stress_test.py [N]
+Run from the repository root.
+"""
+import io
+import os
+import re
+import sys
+import time
+import random
+import tempfile
+import threading
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# The fakes replace the models, so don't load the real ones in the background
+os.environ['WARMUP_MODELS'] = '0'
+import app as server
+from result_cache import ResultCache
+
+
+class FakeTTS:
+    voice = 'fake'
+
+    def segments(self, text, vspeed=1):
+        # Several segments with pauses in between so jobs interleave; each
+        # "sample" is a character code
+        for word in text.split():
+            time.sleep(random.uniform(0, 0.02))
+            yield np.array([ord(c) for c in word + ' '], dtype=np.float32)
+
+
+def fake_encode(audio, audio_format='mp3'):
+    return ''.join(chr(int(sample)) for sample in audio).encode('utf-8')
+
+
+def fake_ocr(job, unique_id, file_extension, temp_path, language, on_page=None):
+    job.pages_total = job.pages_done = 1
+    with open(temp_path, encoding='utf-8') as f:
+        text = f.read()
+    if on_page:
+        on_page(0, text)
+    return [text], {}
+
+
+def expected_audio(text):
+    return ''.join(word + ' ' for word in text.split()).encode('utf-8')
+
+
+def upload(client, index, results):
+    text = f"document {index} " + " ".join(f"word{index}-{n}" for n in range(20))
+    while True:
+        response = client.post('/file', data={'file': (io.BytesIO(text.encode('utf-8')), f"doc{index}.png")},
+                               content_type='multipart/form-data')
+        if response.status_code != 429:
+            break
+        time.sleep(0.1)
+    job_id = re.search(r'/jobs/([0-9a-f-]{36})', response.get_data(as_text=True)).group(1)
+
+    while True:
+        status = client.get(f'/jobs/{job_id}').get_json()
+        if status['stage'] in ('done', 'failed'):
+            break
+        time.sleep(0.05)
+
+    if status['stage'] == 'failed':
+        results[index] = f"job failed: {status['error']}"
+        return
+    with open(os.path.join(server.OUTPUT_FOLDER, status['result']['audio']), 'rb') as f:
+        audio = f.read()
+    for name in (status['result']['audio'], status['result']['pdf']):
+        os.remove(os.path.join(server.OUTPUT_FOLDER, name))
+    results[index] = None if audio == expected_audio(text) else "audio does not match this upload"
+
+
+def run(count):
+    server.tts = FakeTTS()
+    server.encode_audio = fake_encode
+    server.run_ocr = fake_ocr
+    server.cache = ResultCache(tempfile.mkdtemp())
+    results = {}
+    threads = [threading.Thread(target=upload, args=(server.app.test_client(), i, results)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    failures = {index: error for index, error in results.items() if error}
+    for index, error in sorted(failures.items()):
+        print(f"upload {index}: {error}")
+    print(f"{count - len(failures)}/{count} uploads got their own audio")
+    return not failures
+
+
+if __name__ == '__main__':
+    sys.exit(0 if run(int(sys.argv[1]) if len(sys.argv) > 1 else 32) else 1)
@@ -0,0 +1,45 @@
+"""Per-call overhead of each OCR backend on small and page-sized images.
+
+Usage: python test_units/ocr_backend_benchmark.py [calls]
+Run from the repository root. Backends that aren't installed are skipped.
+"""
+import os
+import sys
+import time
+
+import cv2
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from ocr_backends import PytesseractBackend, TesserocrBackend
+from synthetic_pages import render_page
+
+
+def run(calls):
+    page, _ = render_page(0)
+    gray = cv2.cvtColor(page, cv2.COLOR_BGR2GRAY)
+    # A single line of body text, roughly what one region crop looks like
+    small = gray[300:400, 280:2300]
+    images = {'one line': small, 'full page': gray}
+
+    for factory in (PytesseractBackend, TesserocrBackend):
+        try:
+            backend = factory()
+        except ImportError:
+            print(f"{factory.name}: not installed, skipped")
+            continue
+        # First call pays any one-off engine initialization
+        start = time.perf_counter()
+        backend.image_to_data(small, 6, 'eng')
+        first = time.perf_counter() - start
+        line = f"{backend.name:12s} first call {first * 1000:7.1f} ms"
+        for label, image in images.items():
+            start = time.perf_counter()
+            for _ in range(calls):
+                backend.image_to_data(image, 6, 'eng')
+            line += f"  {label}: {(time.perf_counter() - start) / calls * 1000:7.1f} ms/call"
+        print(line)
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 10)
@@ -0,0 +1,66 @@
+"""Compares the old disk round-trip variant pipeline against the in-memory one.
+
+Usage: python test_units/ocr_inmemory_benchmark.py page1.png [page2.png ...]
+Run from the repository root so ``ocr`` is importable.
+"""
+import os
+import sys
+import time
+import tempfile
+
+import cv2
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import ocr
+from ocr import comprehensive_image_processing, extract_best_text
+
+
+def disk_round_trip(processed_versions, folder, unique_id):
+    # What the pipeline used to do: JPEG-encode every variant, then read it back
+    on_disk = []
+    bytes_written = 0
+    for index, (name, image) in enumerate(processed_versions):
+        path = os.path.join(folder, f"{unique_id}_{index}.jpg")
+        cv2.imwrite(path, image)
+        bytes_written += os.path.getsize(path)
+        on_disk.append((name, Image.open(path)))
+    return on_disk, bytes_written
+
+
+def folder_bytes(folder):
+    return sum(entry.stat().st_size for entry in os.scandir(folder) if entry.is_file())
+
+
+def run(pages, language='eng'):
+    folder = tempfile.mkdtemp()
+    # Anything the in-memory path still writes (debug variants) lands here
+    ocr.PROCESSED_FOLDER = tempfile.mkdtemp()
+    legacy_times, legacy_bytes = [], 0
+    memory_times, memory_bytes = [], 0
+
+    for page_num, page in enumerate(pages):
+        start = time.perf_counter()
+        versions = comprehensive_image_processing(page, f"bench_{page_num}", save_debug=False)
+        versions, written = disk_round_trip(versions, folder, f"bench_{page_num}")
+        extract_best_text(versions, language)
+        legacy_times.append(time.perf_counter() - start)
+        legacy_bytes += written
+
+        before = folder_bytes(ocr.PROCESSED_FOLDER)
+        start = time.perf_counter()
+        versions = comprehensive_image_processing(page, f"bench_{page_num}", save_debug=False)
+        extract_best_text(versions, language)
+        memory_times.append(time.perf_counter() - start)
+        memory_bytes += folder_bytes(ocr.PROCESSED_FOLDER) - before
+
+    print(f"pages: {len(pages)}")
+    print(f"disk round-trip: {sum(legacy_times) / len(pages):.3f}s/page, {legacy_bytes / len(pages) / 1e6:.2f} MB written/page")
+    print(f"in-memory:       {sum(memory_times) / len(pages):.3f}s/page, {memory_bytes / len(pages) / 1e6:.2f} MB written/page")
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    run(sys.argv[1:])
@@ -0,0 +1,110 @@
+"""Per-variant preprocessing cost on 300-DPI pages: the old eager pipeline
+versus the preprocessing graph.
+
+For every variant, times computing just that variant (and what it depends on)
+from a fresh graph, then compares whole-page totals:
+
+  legacy   the previous comprehensive_image_processing, every variant eagerly
+  graph    every variant through the graph, shared nodes computed once
+  preview  ranking all variants on the downscaled preview
+  lazy     preview + the top 3 ranked variants at full resolution, roughly
+           what extract_best_text computes when the early exit triggers
+
+Usage: python test_units/preprocess_benchmark.py [pages]
+Run from the repository root.
+"""
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from preprocess_graph import VARIANTS, Variants
+from ocr import rank_variant_names
+from synthetic_pages import degrade, render_page
+
+
+def legacy_processing(original):
+    # The variant pipeline as it was before the graph, minus logging
+    versions = [("Original", original)]
+    gray = cv2.cvtColor(original, cv2.COLOR_BGR2GRAY)
+    _, thresh1 = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    versions.append(("Basic Threshold", thresh1))
+    versions.append(("Adaptive Threshold", cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+                                                                 cv2.THRESH_BINARY, 11, 2)))
+    denoised = cv2.fastNlMeansDenoising(gray, None, 10, 7, 21)
+    versions.append(("Denoised", denoised))
+    versions.append(("Denoised + Threshold", cv2.threshold(denoised, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)[1]))
+    enhanced = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8)).apply(gray)
+    versions.append(("Contrast Enhanced", enhanced))
+    versions.append(("Enhanced + Threshold", cv2.threshold(enhanced, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)[1]))
+    kernel = np.ones((1, 1), np.uint8)
+    versions.append(("Morphological Ops", cv2.erode(cv2.dilate(gray, kernel, iterations=1), kernel, iterations=1)))
+    blurred = cv2.GaussianBlur(gray, (0, 0), 3)
+    versions.append(("Sharpened", cv2.addWeighted(gray, 1.5, blurred, -0.5, 0)))
+    versions.append(("Inverted", cv2.bitwise_not(gray)))
+    height, width = gray.shape
+    versions.append(("Scaled", cv2.resize(gray, (width * 2, height * 2), interpolation=cv2.INTER_CUBIC)))
+    thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)[1]
+    contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    for contour in sorted(contours, key=cv2.contourArea, reverse=True)[:5]:
+        angle = cv2.minAreaRect(contour)[-1]
+        angle = -(90 + angle) if angle < -45 else -angle
+        if abs(angle) > 0.5:
+            matrix = cv2.getRotationMatrix2D((width // 2, height // 2), angle, 1.0)
+            versions.append(("Skew Corrected", cv2.warpAffine(gray, matrix, (width, height), flags=cv2.INTER_CUBIC,
+                                                              borderMode=cv2.BORDER_REPLICATE)))
+            break
+    return versions
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def run(pages):
+    kinds = ('clean', 'noise', 'skew', 'low_contrast')
+    per_variant = {name: [] for name, _, _ in VARIANTS}
+    totals = {'legacy': [], 'graph': [], 'preview': [], 'lazy': []}
+    pixels = {'legacy': 0, 'graph': 0}
+
+    for seed in range(pages):
+        image, _ = render_page(seed, dpi=300)
+        for kind in kinds:
+            page = degrade(image, kind, seed)
+            seconds, versions = timed(lambda: legacy_processing(page))
+            totals['legacy'].append(seconds)
+            pixels['legacy'] += sum(version.shape[0] * version.shape[1] for _, version in versions)
+
+            seconds, versions = timed(lambda: list(Variants(page)))
+            totals['graph'].append(seconds)
+            pixels['graph'] += sum(version.shape[0] * version.shape[1] for _, version in versions)
+
+            for name in per_variant:
+                seconds, _ = timed(lambda: Variants(page).get(name))
+                per_variant[name].append(seconds)
+
+            variants = Variants(page)
+            seconds, ranked = timed(lambda: rank_variant_names(variants))
+            totals['preview'].append(seconds)
+            seconds, _ = timed(lambda: [variants.get(name) for name in ranked[:3]])
+            totals['lazy'].append(totals['preview'][-1] + seconds)
+
+    print(f"{len(totals['legacy'])} pages at 300 DPI ({', '.join(kinds)})\n")
+    print("variant (alone, incl. dependencies)   mean")
+    for name, times in per_variant.items():
+        print(f"  {name:34s} {np.mean(times) * 1000:8.1f} ms")
+    print("\nper page                              mean")
+    for mode, times in totals.items():
+        print(f"  {mode:34s} {np.mean(times) * 1000:8.1f} ms")
+    print(f"\nvariant pixels handed to OCR: legacy {pixels['legacy'] / len(totals['legacy']) / 1e6:.1f} MP/page, "
+          f"graph {pixels['graph'] / len(totals['graph']) / 1e6:.1f} MP/page")
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 2)
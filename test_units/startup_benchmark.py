@@ -0,0 +1,67 @@
+"""Cold-start timings for the Flask app.
+
+For each mode, starts a fresh interpreter and measures how long `import app`
+takes, when `/` first answers, and when `/readyz` reports the models loaded:
+
+  lazy     WARMUP_MODELS=0: nothing loads until the first job
+  warmup   default: models load in a background thread after import
+  preload  PRELOAD_MODELS=1: models load during import (gunicorn --preload);
+           the OCR worker pool is left for after the fork, so it doesn't
+           count towards readiness here
+
+Usage: python test_units/startup_benchmark.py [runs]
+Run from the repository root.
+"""
+import os
+import sys
+import json
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODES = {
+    'lazy': {'WARMUP_MODELS': '0'},
+    'warmup': {},
+    'preload': {'PRELOAD_MODELS': '1'},
+}
+
+# Runs in the child interpreter; prints one JSON line of timings
+PROBE = """
+import json, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter() - start
+client = app.app.test_client()
+client.get('/')
+first_response = time.perf_counter() - start
+ready = None
+while time.perf_counter() - start < TIMEOUT:
+    if client.get('/readyz').status_code == 200:
+        ready = time.perf_counter() - start
+        break
+    time.sleep(0.05)
+print(json.dumps({'import_seconds': imported, 'first_response_seconds': first_response, 'ready_seconds': ready}))
+"""
+
+
+def measure(mode, timeout=600):
+    env = dict(os.environ, **MODES[mode])
+    output = subprocess.run([sys.executable, '-c', PROBE.replace('TIMEOUT', str(timeout))], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def run(runs):
+    for mode in MODES:
+        # Lazy mode never becomes ready on its own, so don't wait for it
+        samples = [measure(mode, timeout=0 if mode == 'lazy' else 600) for _ in range(runs)]
+        row = {}
+        for key in ('import_seconds', 'first_response_seconds', 'ready_seconds'):
+            values = sorted(sample[key] for sample in samples if sample[key] is not None)
+            row[key] = f"{values[len(values) // 2]:.2f}s" if values else "never"
+        print(f"{mode:8s} import {row['import_seconds']:>8s}  first response {row['first_response_seconds']:>8s}  "
+              f"ready {row['ready_seconds']:>8s}")
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 3)
@@ -0,0 +1,131 @@
+"""Synthetic scanned pages with known text, for benchmarks that need labels.
+
+Pages can be degraded like real scans (noise, skew, inversion, low contrast)
+and bundled into multi-page PDFs; text corpora come from the same sentences.
+"""
+import random
+
+import cv2
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+SENTENCES = [
+    "Multivariable calculus extends the derivative to functions of several variables.",
+    "Linear algebra studies vector spaces and the linear maps between them.",
+    "Partial derivatives measure how a function changes along one axis.",
+    "The gradient points in the direction of steepest ascent.",
+    "A matrix can describe rotations, projections and shears of the plane.",
+    "Line integrals add up a vector field along a curve.",
+    "Eigenvectors keep their direction when a linear map is applied.",
+    "Flux integrals measure how much of a field passes through a surface.",
+]
+
+
+def load_font(size):
+    for name in ("DejaVuSans.ttf", "Arial.ttf", "LiberationSans-Regular.ttf"):
+        try:
+            return ImageFont.truetype(name, size)
+        except OSError:
+            pass
+    return ImageFont.load_default(size=size)
+
+
+def wrap_lines(draw, rng, font, width, count):
+    # `count` lines of random sentences word-wrapped to `width` pixels
+    lines, words = [], []
+    while len(lines) < count:
+        if not words:
+            words = rng.choice(SENTENCES).split()
+        line = words.pop(0)
+        while words and draw.textlength(f"{line} {words[0]}", font=font) <= width:
+            line += " " + words.pop(0)
+        lines.append(line)
+    return lines
+
+
+def render_page(seed=0, dpi=300, lines=12, banner=True, figure=True, columns=1):
+    # Letter-size page with a dark title banner (white text), body paragraphs
+    # and a noisy "figure" block, surrounded by wide margins. With columns=2
+    # the body is set in two columns of `lines` lines each under the banner.
+    # Returns the BGR image and the text a perfect OCR would produce, in
+    # reading order.
+    rng = random.Random(seed)
+    width, height = int(8.5 * dpi), int(11 * dpi)
+    page = Image.new("L", (width, height), 255)
+    draw = ImageDraw.Draw(page)
+    margin = dpi
+    body_font = load_font(dpi // 7)
+    line_height = int(dpi / 7 * 1.6)
+    truth = []
+    y = margin
+
+    if banner:
+        title = rng.choice(SENTENCES).split(" the ")[0].rstrip(".")
+        draw.rectangle([margin, y, width - margin, y + line_height * 2], fill=30)
+        draw.text((margin + dpi // 6, y + line_height // 2), title, font=load_font(dpi // 6), fill=235)
+        truth.append(title)
+        y += line_height * 3
+
+    if columns == 1:
+        for _ in range(lines):
+            sentence = rng.choice(SENTENCES)
+            draw.text((margin, y), sentence, font=body_font, fill=0)
+            truth.append(sentence)
+            y += line_height
+    else:
+        gutter = dpi // 3
+        column_width = (width - 2 * margin - gutter * (columns - 1)) // columns
+        for column in range(columns):
+            x = margin + column * (column_width + gutter)
+            for row, line in enumerate(wrap_lines(draw, rng, body_font, column_width, lines)):
+                draw.text((x, y + row * line_height), line, font=body_font, fill=0)
+                truth.append(line)
+        y += lines * line_height
+
+    if figure:
+        y += line_height
+        size = (height - margin - y) // 2
+        noise = np.random.default_rng(seed).integers(0, 255, (size, size), dtype=np.uint8)
+        page.paste(Image.fromarray(noise), (width // 2 - size // 2, y))
+
+    return cv2.cvtColor(np.asarray(page), cv2.COLOR_GRAY2BGR), "\n".join(truth)
+
+
+DEGRADATIONS = ('clean', 'noise', 'skew', 'inverted', 'low_contrast')
+
+
+def degrade(image, kind, seed=0):
+    # Mimic common scan defects on a rendered BGR page
+    rng = np.random.default_rng(seed)
+    if kind == 'clean':
+        return image
+    if kind == 'noise':
+        noisy = image.astype(np.int16) + rng.normal(0, 25, image.shape[:2])[..., None].astype(np.int16)
+        noisy = np.clip(noisy, 0, 255).astype(np.uint8)
+        speckles = rng.random(image.shape[:2]) < 0.01
+        noisy[speckles] = 0
+        return noisy
+    if kind == 'skew':
+        angle = rng.uniform(2, 4) * rng.choice([-1, 1])
+        height, width = image.shape[:2]
+        matrix = cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+        return cv2.warpAffine(image, matrix, (width, height), borderValue=(255, 255, 255))
+    if kind == 'inverted':
+        return 255 - image
+    if kind == 'low_contrast':
+        faded = 110 + image.astype(np.float32) * (60 / 255)
+        return cv2.GaussianBlur(faded.astype(np.uint8), (3, 3), 0)
+    raise ValueError(f"Unknown degradation: {kind}")
+
+
+def write_pdf(images, path, dpi=300):
+    # Multi-page PDF, one rasterized page per image
+    pages = [Image.fromarray(cv2.cvtColor(image, cv2.COLOR_BGR2RGB)) for image in images]
+    pages[0].save(path, save_all=True, append_images=pages[1:], resolution=dpi)
+    return path
+
+
+def text_corpus(seed=0, paragraphs=5, sentences=4):
+    # Plain text shaped like a transcription: paragraphs of known sentences
+    rng = random.Random(seed)
+    return "\n\n".join(" ".join(rng.choice(SENTENCES) for _ in range(sentences)) for _ in range(paragraphs))
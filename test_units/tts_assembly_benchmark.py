@@ -0,0 +1,64 @@
+"""Compares the old file-per-segment + moviepy concatenation against the
+in-memory assembly in Natural_TTS.text_to_speech, on the natural_tts_tester.py
+text. Each mode runs in its own process so peak RSS is measured separately.
+
+Usage: python test_units/tts_assembly_benchmark.py
+Run from the repository root. The legacy mode needs moviepy installed.
+"""
+import os
+import re
+import sys
+import time
+import resource
+import tempfile
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def tester_text():
+    source = open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'natural_tts_tester.py')).read()
+    return re.search(r'text_to_speech\("(.*)", "[^"]*"\)', source, re.S).group(1)
+
+
+def legacy(tts, text, folder):
+    # The previous implementation: one soundfile write per segment, then
+    # moviepy (one ffmpeg per clip) re-encoding everything into one file
+    import soundfile as sf
+    from moviepy import AudioFileClip
+    from moviepy.audio.AudioClip import concatenate_audioclips
+
+    paths = []
+    for i, audio in enumerate(tts.segments(text)):
+        path = os.path.join(folder, f"{i}.mp3")
+        sf.write(path, audio, 24000)
+        paths.append(path)
+    clips = [AudioFileClip(path) for path in paths]
+    concatenate_audioclips(clips).write_audiofile(os.path.join(folder, "output.mp3"), logger=None)
+
+
+def in_memory(tts, text, folder):
+    tts.text_to_speech(text, output_path=os.path.join(folder, "output.mp3"))
+
+
+def run_mode(mode):
+    from natural_tts import Natural_TTS
+
+    tts = Natural_TTS()
+    for _ in tts.segments("Warm up."):
+        pass
+    folder = tempfile.mkdtemp()
+    start = time.perf_counter()
+    (legacy if mode == 'legacy' else in_memory)(tts, tester_text(), folder)
+    elapsed = time.perf_counter() - start
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{mode:10s} wall {elapsed:6.2f}s  peak RSS {peak_mb:7.1f} MB  "
+          f"output {os.path.getsize(os.path.join(folder, 'output.mp3')) / 1e6:.2f} MB")
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        run_mode(sys.argv[1])
+    else:
+        for mode in ('legacy', 'in_memory'):
+            subprocess.run([sys.executable, os.path.abspath(__file__), mode], check=False)
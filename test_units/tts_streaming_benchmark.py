@@ -0,0 +1,43 @@
+"""Time-to-first-audio for streamed synthesis versus waiting for the whole file.
+
+Usage: python test_units/tts_streaming_benchmark.py [text_file]
+Defaults to the text in natural_tts_tester.py. Run from the repository root.
+"""
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from natural_tts import Natural_TTS
+
+
+def tester_text():
+    source = open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'natural_tts_tester.py')).read()
+    return re.search(r'text_to_speech\("(.*)", "[^"]*"\)', source, re.S).group(1)
+
+
+def run(text):
+    tts = Natural_TTS()
+    # Warm the model so the first measurement isn't dominated by loading it
+    for _ in tts.stream_speech("Warm up."):
+        pass
+
+    start = time.perf_counter()
+    first_chunk = None
+    chunks = 0
+    total_bytes = 0
+    for chunk in tts.stream_speech(text):
+        if first_chunk is None:
+            first_chunk = time.perf_counter() - start
+        chunks += 1
+        total_bytes += len(chunk)
+    total = time.perf_counter() - start
+
+    print(f"characters: {len(text)}, chunks: {chunks}, audio bytes: {total_bytes}")
+    print(f"time to first audio chunk: {first_chunk:.2f}s")
+    print(f"total synthesis time:      {total:.2f}s")
+
+
+if __name__ == '__main__':
+    run(open(sys.argv[1]).read() if len(sys.argv) > 1 else tester_text())
@@ -0,0 +1,135 @@
+import os
+import re
+import hashlib
+from collections import Counter
+
+# Longest chunk handed to the TTS model in one go
+TTS_CHUNK_MAX_CHARS = int(os.environ.get('TTS_CHUNK_MAX_CHARS', 300))
+# Lines this close to the top/bottom of a page are header/footer candidates
+HEADER_FOOTER_LINES = 2
+# Pages buffered by HeaderFooterFilter before it starts releasing pages
+HEADER_FOOTER_LOOKAHEAD = int(os.environ.get('HEADER_FOOTER_LOOKAHEAD', 2))
+
+# Punctuation that normally wraps a word rather than being OCR noise
+WORD_PUNCTUATION = '"\'“”‘’()[]{}.,;:!?…'
+
+HYPHENATED_BREAK = re.compile(r'(\w)-\n\s*(\w)')
+SENTENCE_END = re.compile(r'(?:(?<=[.!?])|(?<=[.!?]["\')\]]))\s+(?=["\'(\[]?[A-Z0-9])')
+CLAUSE_BREAK = re.compile(r'(?<=[,;:])\s+')
+
+def is_junk_token(token):
+    # OCR noise: runs of punctuation or stray symbols with no letters/digits,
+    # and long mixes where symbols outnumber letters ("~|;:_l|"). Ordinary
+    # quotes, brackets and sentence punctuation around a word don't count
+    # against it, so '("e.g."),' survives.
+    letters = sum(char.isalnum() for char in token)
+    if letters == 0:
+        return token not in ('-', '&', '—', '–')
+    core = token.strip(WORD_PUNCTUATION)
+    return len(core) > 3 and letters < len(core) / 2
+
+def clean_line(line):
+    return " ".join(token for token in line.split() if not is_junk_token(token))
+
+def repeated_line_key(line):
+    # Page numbers change from page to page, so compare lines with digits masked
+    return re.sub(r'\d+', '#', line.strip().lower())
+
+def repeated_edge_lines(page_lines):
+    # Lines (digit-masked) that appear near the top or bottom of most pages:
+    # running titles, page numbers, course codes. Needs two pages to tell.
+    if len(page_lines) < 2:
+        return set()
+    counts = Counter()
+    for lines in page_lines:
+        edges = set(repeated_line_key(line) for line in lines[:HEADER_FOOTER_LINES] + lines[-HEADER_FOOTER_LINES:])
+        counts.update(key for key in edges if key)
+    threshold = max(2, len(page_lines) // 2 + 1)
+    return {key for key, count in counts.items() if count >= threshold}
+
+def remove_edge_lines(lines, repeated):
+    edge = set(range(HEADER_FOOTER_LINES)) | set(range(len(lines) - HEADER_FOOTER_LINES, len(lines)))
+    return "\n".join(line for index, line in enumerate(lines)
+                     if not (index in edge and repeated_line_key(line) in repeated))
+
+class HeaderFooterFilter:
+    # Drops running headers/footers from pages that arrive one at a time:
+    # the first `lookahead` pages are held back to learn the repeated lines,
+    # after which every page is cleaned as soon as it is pushed.
+    def __init__(self, lookahead=HEADER_FOOTER_LOOKAHEAD):
+        self.lookahead = lookahead
+        self.pending = []
+        self.repeated = None
+
+    def push(self, page):
+        # Returns the cleaned pages that are ready, in order
+        if self.repeated is not None:
+            return [remove_edge_lines(page.splitlines(), self.repeated)]
+        self.pending.append(page)
+        if len(self.pending) < self.lookahead:
+            return []
+        return self.flush()
+
+    def flush(self):
+        page_lines = [page.splitlines() for page in self.pending]
+        if self.repeated is None:
+            self.repeated = repeated_edge_lines(page_lines)
+        self.pending = []
+        return [remove_edge_lines(lines, self.repeated) for lines in page_lines]
+
+def normalize_text(text):
+    # Re-join words split across lines, drop junk tokens and turn OCR line
+    # breaks into plain spaces; blank lines (paragraphs) are kept.
+    text = HYPHENATED_BREAK.sub(r'\1\2', text)
+    paragraphs = []
+    for paragraph in re.split(r'\n\s*\n', text):
+        lines = [clean_line(line) for line in paragraph.splitlines()]
+        paragraph = " ".join(line for line in lines if line)
+        if paragraph:
+            paragraphs.append(paragraph)
+    return "\n\n".join(paragraphs)
+
+def split_long(sentence, max_chars):
+    # Break an over-long sentence at clause boundaries, then at spaces
+    pieces = []
+    current = ""
+    for part in CLAUSE_BREAK.split(sentence):
+        if current and len(current) + 1 + len(part) > max_chars:
+            pieces.append(current)
+            current = ""
+        while len(part) > max_chars:
+            cut = part.rfind(" ", 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            pieces.append(part[:cut].strip())
+            part = part[cut:].strip()
+        current = f"{current} {part}".strip()
+    if current:
+        pieces.append(current)
+    return pieces
+
+def chunk_id(text):
+    # Content-derived, so the same sentence gets the same id in any document
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]
+
+def chunk_text(text, max_chars=None):
+    # Pack whole sentences into chunks of at most max_chars. Chunks never
+    # span a paragraph break. Returns [{'id': ..., 'text': ...}] in order.
+    if max_chars is None:
+        max_chars = TTS_CHUNK_MAX_CHARS
+    chunks = []
+    for paragraph in re.split(r'\n\s*\n', text):
+        current = ""
+        for sentence in SENTENCE_END.split(paragraph.strip()):
+            sentence = sentence.strip()
+            if not sentence:
+                continue
+            pieces = split_long(sentence, max_chars) if len(sentence) > max_chars else [sentence]
+            for piece in pieces:
+                if current and len(current) + 1 + len(piece) > max_chars:
+                    chunks.append(current)
+                    current = piece
+                else:
+                    current = f"{current} {piece}".strip()
+        if current:
+            chunks.append(current)
+    return [{'id': chunk_id(chunk), 'text': chunk} for chunk in chunks]
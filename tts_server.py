@@ -0,0 +1,177 @@
+"""Shared Kokoro TTS service.
+
+One process keeps a warm KPipeline per language and serves every Flask worker
+over a Unix socket, instead of each worker loading its own copy of the model.
+
+    python tts_server.py --socket /tmp/readdf-tts.sock --preload a
+
+and start the app with TTS_SOCKET=/tmp/readdf-tts.sock.
+"""
+import os
+import re
+import time
+import queue
+import logging
+import argparse
+import threading
+from multiprocessing.connection import Client, Listener
+
+import numpy as np
+
+from natural_tts import Natural_TTS
+
+logger = logging.getLogger(__name__)
+
+TTS_SOCKET = os.environ.get('TTS_SOCKET', '')
+class ModelWorker:
+    # Owns one warm pipeline and runs segments from all connected jobs, one
+    # at a time. Kokoro has no batched inference to share work between
+    # segments, but each job only has one segment queued at a time, so the
+    # FIFO queue takes turns between jobs and concurrent jobs advance
+    # together instead of one finishing before the next starts.
+    def __init__(self, language):
+        self.tts = Natural_TTS(language)
+        self.queue = queue.Queue()
+        self.segments_done = 0
+        self.wait_seconds = 0.0
+        self.jobs_sharing = 0
+        threading.Thread(target=self.run, daemon=True, name=f"tts-model-{language}").start()
+
+    def submit(self, text, voice, speed):
+        reply = queue.Queue(maxsize=1)
+        self.queue.put((text, voice, speed, reply, time.monotonic()))
+        return reply
+
+    def run(self):
+        while True:
+            text, voice, speed, reply, queued = self.queue.get()
+            self.wait_seconds += time.monotonic() - queued
+            # This segment plus one from every other job waiting its turn
+            self.jobs_sharing += 1 + self.queue.qsize()
+            try:
+                self.tts.voice = voice
+                reply.put(list(self.tts.segments(text, speed)))
+            except Exception as e:
+                logger.exception("Synthesis failed")
+                reply.put(e)
+            self.segments_done += 1
+
+    def stats(self):
+        segments = self.segments_done
+        return {
+            'queue_depth': self.queue.qsize(),
+            'segments': segments,
+            'mean_queue_wait_seconds': self.wait_seconds / segments if segments else 0,
+            'mean_jobs_sharing': self.jobs_sharing / segments if segments else 0,
+        }
+
+class TTSServer:
+    def __init__(self, socket_path, preload=()):
+        self.socket_path = socket_path
+        self.workers = {}
+        self.workers_lock = threading.Lock()
+        for language in preload:
+            self.worker(language)
+
+    def worker(self, language):
+        with self.workers_lock:
+            if language not in self.workers:
+                logger.info(f"Loading Kokoro pipeline for language '{language}'")
+                self.workers[language] = ModelWorker(language)
+            return self.workers[language]
+
+    def serve_forever(self):
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+        with Listener(self.socket_path, family='AF_UNIX') as listener:
+            logger.info(f"TTS server listening on {self.socket_path}")
+            while True:
+                connection = listener.accept()
+                threading.Thread(target=self.handle, args=(connection,), daemon=True).start()
+
+    def handle(self, connection):
+        try:
+            request = connection.recv()
+            if request['op'] == 'stats':
+                with self.workers_lock:
+                    workers = dict(self.workers)
+                connection.send({language: worker.stats() for language, worker in workers.items()})
+            elif request['op'] == 'synthesize':
+                self.synthesize(connection, request)
+        except (EOFError, OSError):
+            # The client went away mid-request
+            pass
+        except Exception as e:
+            logger.exception("TTS request failed")
+            try:
+                connection.send({'error': str(e)})
+            except OSError:
+                pass
+        finally:
+            connection.close()
+
+    def synthesize(self, connection, request):
+        worker = self.worker(request['language'])
+        # Same split Natural_TTS uses; each piece is one turn on the model
+        pieces = [piece for piece in re.split(r'\n+', request['text']) if piece.strip()]
+        for piece in pieces:
+            result = worker.submit(piece, request['voice'], request['speed']).get()
+            if isinstance(result, Exception):
+                connection.send({'error': str(result)})
+                return
+            for audio in result:
+                connection.send({'audio': audio.tobytes()})
+        connection.send({'done': True})
+
+class TTSClient(Natural_TTS):
+    # Drop-in for Natural_TTS in Flask workers: segments come from the shared
+    # server, encoding (stream_speech / text_to_speech) still happens here
+    def __init__(self, socket_path=TTS_SOCKET, language="a", voice="af_heart"):
+        self.socket_path = socket_path
+        self.language = language
+        self.voice = voice
+        self.connected = False
+
+    def load(self):
+        # Nothing to load here; ready once the server answers
+        self.stats()
+        self.connected = True
+
+    @property
+    def ready(self):
+        return self.connected
+
+    def request(self, payload):
+        connection = Client(self.socket_path, family='AF_UNIX')
+        connection.send(payload)
+        return connection
+
+    def segments(self, text, vspeed=1):
+        connection = self.request({'op': 'synthesize', 'text': text, 'language': self.language,
+                                   'voice': self.voice, 'speed': vspeed})
+        try:
+            while True:
+                message = connection.recv()
+                if 'error' in message:
+                    raise RuntimeError(f"TTS server error: {message['error']}")
+                if message.get('done'):
+                    return
+                yield np.frombuffer(message['audio'], dtype=np.float32)
+        finally:
+            connection.close()
+
+    def stats(self):
+        connection = self.request({'op': 'stats'})
+        try:
+            return connection.recv()
+        finally:
+            connection.close()
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO,
+                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Shared Kokoro TTS server")
+    parser.add_argument('--socket', default=TTS_SOCKET or '/tmp/readdf-tts.sock')
+    parser.add_argument('--preload', nargs='*', default=['a'], help="language codes to load at startup")
+    args = parser.parse_args()
+    TTSServer(args.socket, args.preload).serve_forever()
@@ -0,0 +1,72 @@
+import os
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Seconds between attempts when loading a model fails (e.g. the TTS server
+# isn't up yet)
+WARMUP_RETRY_SECONDS = float(os.environ.get('WARMUP_RETRY_SECONDS', 5))
+
+class Warmup:
+    # Loads heavy backends (OCR engine, TTS model) off the request path.
+    # Each task is a no-argument callable that is safe to call again; the
+    # backends also load themselves on first use, so a request that arrives
+    # early simply waits for the same load.
+    def __init__(self, tasks):
+        self.tasks = dict(tasks)
+        self.status = {name: {'state': 'pending', 'seconds': None, 'error': None} for name in self.tasks}
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def run_task(self, name):
+        with self.lock:
+            self.status[name].update(state='loading', error=None)
+        start = time.perf_counter()
+        try:
+            self.tasks[name]()
+        except Exception as e:
+            logger.warning(f"Warm-up of {name} failed: {e}")
+            with self.lock:
+                self.status[name].update(state='failed', error=str(e))
+            return False
+        seconds = time.perf_counter() - start
+        logger.info(f"Warm-up of {name} finished in {seconds:.2f}s")
+        with self.lock:
+            self.status[name].update(state='ready', seconds=round(seconds, 3))
+        return True
+
+    def run(self, retry=False, names=None):
+        # Load everything (or just `names`) that isn't ready yet, in this
+        # thread. With retry, failed tasks are tried again until they succeed.
+        pending = [name for name in (names or self.tasks) if self.status[name]['state'] != 'ready']
+        while pending:
+            pending = [name for name in pending if not self.run_task(name)]
+            if not retry:
+                break
+            if pending:
+                time.sleep(WARMUP_RETRY_SECONDS)
+
+    def start(self, names=None):
+        self.thread = threading.Thread(target=self.run, kwargs={'retry': True, 'names': names}, daemon=True,
+                                       name="warmup")
+        self.thread.start()
+        return self
+
+    def defer(self, names):
+        # Leave these out of readiness until something runs them (e.g. after
+        # a fork); run() and start() without names still pick them up
+        with self.lock:
+            for name in names:
+                if self.status[name]['state'] == 'pending':
+                    self.status[name]['state'] = 'deferred'
+
+    @property
+    def ready(self):
+        with self.lock:
+            return all(status['state'] in ('ready', 'deferred') for status in self.status.values())
+
+    def to_dict(self):
+        with self.lock:
+            return {name: dict(status) for name, status in self.status.items()}